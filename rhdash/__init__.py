@@ -1,3 +1,7 @@
 """Version of rhdash."""
+import time
 
 __version__ = '0.1.13'
+
+# When this process started loading rhdash, for startup timings
+STARTED = time.monotonic()
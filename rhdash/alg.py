@@ -1,4 +1,10 @@
 """Helper functions, mostly math."""
+import copy
+import threading
+from collections import OrderedDict
+from collections import deque
+
+import numpy as np
 
 
 def ema_n_days(days, close_today, ema_yesterday):
@@ -8,5 +14,511 @@ def ema_n_days(days, close_today, ema_yesterday):
                                                (1 - smooth_over_days))
 
 
+def ema_series(ema_days, close_prices):
+    """EMAs for every period in ema_days, computed in a single pass.
+
+    Each series is seeded with the simple average of its first n closes at
+    index n - 1 and then follows the ema_n_days recurrence. All periods are
+    advanced together, so the cost is one vector step per bar no matter how
+    many EMAs are requested. Returns {n_days: array} aligned with the input.
+
+    close_prices may also be 2-D, one row per symbol, with shorter rows
+    padded on the left with NaN. Every row is then seeded from its own first
+    n closes and all rows are advanced together as well.
+    """
+    close = np.asarray(close_prices, dtype=float)
+    days = np.asarray(ema_days, dtype=int)
+
+    if len(days) == 0:
+        return {}
+
+    rows = np.atleast_2d(close)
+    n_rows, n_bars = rows.shape
+    smooth_over_days = (2.0 / (1 + days))[:, None]
+    keep = 1 - smooth_over_days
+
+    # Shift every row left past its padding to take the seeding averages
+    start = np.isfinite(rows).argmax(axis=1)
+    shifted = start[:, None] + np.arange(n_bars)
+    aligned = np.take_along_axis(rows, np.minimum(shifted, n_bars - 1), 1)
+    aligned[shifted >= n_bars] = np.nan
+    seeds = np.full((len(days), n_rows), np.nan)
+    for n_days in set(days.tolist()):
+        if 0 < n_days <= n_bars:
+            seeds[days == n_days] = aligned[:, :n_days].sum(axis=1) / n_days
+
+    seed_at = start[None, :] + days[:, None] - 1
+    emas = np.full((len(days), n_rows, n_bars), np.nan)
+    state = np.full((len(days), n_rows), np.nan)
+    for i in range(n_bars):
+        state = (rows[:, i] * smooth_over_days) + (state * keep)
+        seeding = seed_at == i
+        if seeding.any():
+            state[seeding] = seeds[seeding]
+        emas[:, :, i] = state
+
+    if close.ndim < 2:
+        emas = emas[:, 0]
+    return {n_days: emas[i] for i, n_days in enumerate(days.tolist())}
+
+
+def lttb(values, n_out):
+    """Indices of n_out points that keep the shape of values (LTTB).
+
+    Largest-Triangle-Three-Buckets treats values as evenly spaced. The first
+    and last points are always kept. NaNs are skipped.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.flatnonzero(np.isfinite(values))
+    if n_out >= len(finite) or n_out < 3:
+        return finite
+
+    x = finite.astype(float)
+    y = values[finite]
+    edges = np.linspace(1, len(finite) - 1, n_out - 1).astype(int)
+
+    picked = np.empty(n_out, dtype=int)
+    picked[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        following = slice(end, edges[i + 2] if i + 2 < len(edges) else
+                          len(finite))
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+
+        areas = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) -
+                       (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(areas.argmax())
+        picked[i + 1] = a
+    picked[-1] = len(finite) - 1
+
+    return finite[picked]
+
+
 def percent_diff(price, average):
     return 100.0 * (price - average) / price
+
+
+def smooth_series(n_days, alpha, values):
+    """Mean of the first n_days values, then exponential smoothing by alpha.
+
+    Leading NaNs are skipped. With alpha 2 / (1 + n_days) this is the EMA
+    of ema_series; with alpha 1 / n_days it is Wilder's smoothing.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    finite = np.flatnonzero(np.isfinite(values))
+    if len(finite) < n_days:
+        return out
+    seed_at = finite[0] + n_days - 1
+    state = values[finite[0]:seed_at + 1].sum() / n_days
+    out[seed_at] = state
+    keep = 1 - alpha
+    for i in range(seed_at + 1, len(values)):
+        state = (values[i] * alpha) + (state * keep)
+        out[i] = state
+    return out
+
+
+class Smoother:
+    """smooth_series one value at a time. NaN values are skipped."""
+    def __init__(self, n_days, alpha):
+        self.n_days = n_days
+        self.alpha = alpha
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = np.nan
+
+    def settle(self, values, smoothed):
+        """Take the state smooth_series left after values."""
+        finite = values[np.isfinite(values)]
+        self.count = len(finite)
+        self.seed_sum = float(finite[:self.n_days].sum())
+        self.value = smoothed[-1] if len(smoothed) else np.nan
+
+    def advance(self, value):
+        if not np.isfinite(value):
+            return np.nan if self.count < self.n_days else self.value
+        self.count += 1
+        if self.count < self.n_days:
+            self.seed_sum += value
+            return np.nan
+        if self.count == self.n_days:
+            self.value = (self.seed_sum + value) / self.n_days
+        else:
+            self.value = (value * self.alpha) + (self.value *
+                                                 (1 - self.alpha))
+        return self.value
+
+
+def ema_smoother(n_days):
+    return Smoother(n_days, 2.0 / (1 + n_days))
+
+
+class EMA:
+    """Exponential moving average of the closes, as in ema_series."""
+    overlay = True
+
+    def __init__(self, period=20):
+        self.period = int(period)
+        self.label = f"ema_{self.period}"
+        self.ema = ema_smoother(self.period)
+
+    def names(self):
+        return [self.label]
+
+    def batch(self, bars):
+        close = np.asarray(bars["close"], dtype=float)
+        out = ema_series([self.period], close)[self.period]
+        self.ema.settle(close, out)
+        return {self.label: out}
+
+    def step(self, bar):
+        return {self.label: self.ema.advance(bar["close"])}
+
+
+class SMA:
+    """Simple moving average over the last `period` closes."""
+    overlay = True
+
+    def __init__(self, period=20):
+        self.period = int(period)
+        self.label = f"sma_{self.period}"
+        self.window = deque(maxlen=self.period)
+        self.total = 0.0
+
+    def names(self):
+        return [self.label]
+
+    def batch(self, bars):
+        close = np.asarray(bars["close"], dtype=float)
+        out = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            sums = np.cumsum(np.concatenate([[0.0], close]))
+            out[self.period - 1:] = (sums[self.period:] -
+                                     sums[:-self.period]) / self.period
+        self.window = deque(close[-self.period:].tolist(),
+                            maxlen=self.period)
+        self.total = float(sum(self.window))
+        return {self.label: out}
+
+    def step(self, bar):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(bar["close"])
+        self.total += bar["close"]
+        if len(self.window) < self.period:
+            return {self.label: np.nan}
+        return {self.label: self.total / self.period}
+
+
+class Bollinger:
+    """SMA of the closes with bands `width` standard deviations away."""
+    overlay = True
+
+    def __init__(self, period=20, width=2):
+        self.period = int(period)
+        self.width = float(width)
+        self.label = f"bb_{self.period}_{self.width:g}"
+        self.window = deque(maxlen=self.period)
+
+    def names(self):
+        return [f"{self.label}_{band}" for band in ("upper", "mid", "lower")]
+
+    def bands(self, mid, std):
+        upper, middle, lower = self.names()
+        return {
+            upper: mid + self.width * std,
+            middle: mid,
+            lower: mid - self.width * std
+        }
+
+    def batch(self, bars):
+        close = np.asarray(bars["close"], dtype=float)
+        mid = np.full(len(close), np.nan)
+        std = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            n = self.period
+            sums = np.cumsum(np.concatenate([[0.0], close]))
+            squares = np.cumsum(np.concatenate([[0.0], close * close]))
+            mean = (sums[n:] - sums[:-n]) / n
+            variance = (squares[n:] - squares[:-n]) / n - mean * mean
+            mid[n - 1:] = mean
+            std[n - 1:] = np.sqrt(np.maximum(variance, 0.0))
+        self.window = deque(close[-self.period:].tolist(),
+                            maxlen=self.period)
+        return self.bands(mid, std)
+
+    def step(self, bar):
+        self.window.append(bar["close"])
+        if len(self.window) < self.period:
+            return self.bands(np.nan, np.nan)
+        window = np.array(self.window)
+        return self.bands(window.mean(), window.std())
+
+
+class RSI:
+    """Relative strength index, with Wilder's smoothing of gains and losses.
+    """
+    overlay = False
+
+    def __init__(self, period=14):
+        self.period = int(period)
+        self.label = f"rsi_{self.period}"
+        self.previous = np.nan
+        self.gain = Smoother(self.period, 1.0 / self.period)
+        self.loss = Smoother(self.period, 1.0 / self.period)
+
+    def names(self):
+        return [self.label]
+
+    @staticmethod
+    def rsi(gain, loss):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(loss == 0, 100.0,
+                            100.0 - 100.0 / (1.0 + gain / loss))
+
+    def batch(self, bars):
+        close = np.asarray(bars["close"], dtype=float)
+        change = np.diff(close, prepend=np.nan)
+        gains = np.where(change > 0, change, 0.0)
+        losses = np.where(change < 0, -change, 0.0)
+        gains[np.isnan(change)] = np.nan
+        losses[np.isnan(change)] = np.nan
+
+        gain = smooth_series(self.period, self.gain.alpha, gains)
+        loss = smooth_series(self.period, self.loss.alpha, losses)
+        self.gain.settle(gains, gain)
+        self.loss.settle(losses, loss)
+        self.previous = close[-1] if len(close) else np.nan
+        return {self.label: self.rsi(gain, loss)}
+
+    def step(self, bar):
+        change = bar["close"] - self.previous
+        self.previous = bar["close"]
+        gain = self.gain.advance(max(change, 0.0) if np.isfinite(change)
+                                 else np.nan)
+        loss = self.loss.advance(max(-change, 0.0) if np.isfinite(change)
+                                 else np.nan)
+        return {self.label: float(self.rsi(gain, loss))}
+
+
+class MACD:
+    """Fast EMA less slow EMA, its signal EMA and their difference."""
+    overlay = False
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = ema_smoother(int(fast))
+        self.slow = ema_smoother(int(slow))
+        self.signal = ema_smoother(int(signal))
+        self.label = f"macd_{int(fast)}_{int(slow)}_{int(signal)}"
+
+    def names(self):
+        return [self.label, f"{self.label}_signal", f"{self.label}_hist"]
+
+    def lines(self, macd, signal):
+        label, signal_label, hist_label = self.names()
+        return {label: macd, signal_label: signal, hist_label: macd - signal}
+
+    def batch(self, bars):
+        close = np.asarray(bars["close"], dtype=float)
+        emas = ema_series([self.fast.n_days, self.slow.n_days], close)
+        fast, slow = emas[self.fast.n_days], emas[self.slow.n_days]
+        macd = fast - slow
+        signal = smooth_series(self.signal.n_days, self.signal.alpha, macd)
+        self.fast.settle(close, fast)
+        self.slow.settle(close, slow)
+        self.signal.settle(macd, signal)
+        return self.lines(macd, signal)
+
+    def step(self, bar):
+        macd = self.fast.advance(bar["close"]) - self.slow.advance(
+            bar["close"])
+        return self.lines(macd, self.signal.advance(macd))
+
+
+class VWAP:
+    """Volume-weighted average of the typical price, restarting each session.
+
+    Sessions come from bars["session"], e.g. the market date of each bar;
+    without it the average never restarts.
+    """
+    overlay = True
+
+    def __init__(self):
+        self.label = "vwap"
+        self.session = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def names(self):
+        return [self.label]
+
+    def batch(self, bars):
+        typical = (np.asarray(bars["high"], dtype=float) +
+                   np.asarray(bars["low"], dtype=float) +
+                   np.asarray(bars["close"], dtype=float)) / 3
+        volume = np.asarray(bars["volume"], dtype=float)
+        sessions = bars.get("session")
+        if sessions is None:
+            sessions = np.zeros(len(volume))
+        sessions = np.asarray(sessions)
+
+        price_volume = np.cumsum(typical * volume)
+        total_volume = np.cumsum(volume)
+        starts = np.flatnonzero(
+            np.concatenate([[True], sessions[1:] != sessions[:-1]]))
+        start_of = np.repeat(starts, np.diff(np.append(starts, len(volume))))
+        before = start_of - 1
+        price_volume = price_volume - np.where(
+            before >= 0, price_volume[np.maximum(before, 0)], 0.0)
+        total_volume = total_volume - np.where(
+            before >= 0, total_volume[np.maximum(before, 0)], 0.0)
+
+        if len(volume):
+            self.session = sessions[-1]
+            self.price_volume = float(price_volume[-1])
+            self.volume = float(total_volume[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(total_volume > 0, price_volume / total_volume,
+                            np.nan)
+        return {self.label: vwap}
+
+    def step(self, bar):
+        session = bar.get("session", 0)
+        if session != self.session:
+            self.session = session
+            self.price_volume = 0.0
+            self.volume = 0.0
+        typical = (bar["high"] + bar["low"] + bar["close"]) / 3
+        self.price_volume += typical * bar["volume"]
+        self.volume += bar["volume"]
+        if self.volume <= 0:
+            return {self.label: np.nan}
+        return {self.label: self.price_volume / self.volume}
+
+
+INDICATORS = {
+    "sma": SMA,
+    "ema": EMA,
+    "bollinger": Bollinger,
+    "rsi": RSI,
+    "macd": MACD,
+    "vwap": VWAP
+}
+
+
+def make_indicator(spec):
+    """Indicator for a config entry like {"name": "sma", "period": 50}."""
+    params = dict(spec)
+    return INDICATORS[params.pop("name")](**params)
+
+
+class IndicatorEngine:
+    """Indicator values kept per key, e.g. (symbol, interval, label).
+
+    Each key holds every value computed so far, the times of their bars,
+    and the indicator's state just before the last bar. Bars up to the
+    last one are taken as final. The last one may still be forming, so it
+    is stepped again from that state. Only bars from the last one on are
+    stepped, and they are written into buffers that grow by doubling, so
+    the history is not copied on each continuation. The values returned
+    are copies of those asked for. Keys are evicted least recently used
+    first.
+    """
+    def __init__(self, size=256):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compute(self, key, spec, bars, batch=True):
+        """{name: values} aligned with bars for the indicator spec.
+
+        bars holds equal-length arrays: "time" (increasing), "close" and,
+        as the indicator needs them, "high", "low", "volume", "session".
+        Bars that do not continue what key holds are computed in one
+        batch pass if batch is set; otherwise the result is None.
+        """
+        times = np.asarray(bars["time"])
+        if not len(times):
+            names = make_indicator(spec).names()
+            return {name: np.array([]) for name in names}
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["spec"] == spec:
+                values = self._continue(entry, bars, times)
+                if values is not None:
+                    self._entries.move_to_end(key)
+                    return values
+            if not batch:
+                return None
+
+            entry = {"spec": spec}
+            indicator = make_indicator(spec)
+            head = {}
+            if len(times) > 1:
+                head = indicator.batch(
+                    {field: column[:-1]
+                     for field, column in bars.items()})
+            entry["checkpoint"] = copy.deepcopy(indicator)
+            last = self._step(indicator, bars, len(times) - 1)
+            entry["times"] = times.copy()
+            entry["length"] = len(times)
+            entry["values"] = {
+                name: np.append(head.get(name, []), last[name])
+                for name in indicator.names()
+            }
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+            return {
+                name: values.copy()
+                for name, values in entry["values"].items()
+            }
+
+    def _continue(self, entry, bars, times):
+        held = entry["times"][:entry["length"]]
+        if not len(times):
+            return None
+        start = int(np.searchsorted(held, times[0]))
+        last = len(held) - 1
+        overlap = last - start
+        if (start > last or held[start] != times[0] or overlap >= len(times)
+                or times[overlap] != held[last]):
+            return None
+
+        indicator = copy.deepcopy(entry["checkpoint"])
+        fresh = {name: [] for name in indicator.names()}
+        for i in range(overlap, len(times)):
+            if i == len(times) - 1:
+                entry["checkpoint"] = copy.deepcopy(indicator)
+            for name, value in self._step(indicator, bars, i).items():
+                fresh[name].append(value)
+
+        length = last + len(times) - overlap
+        entry["times"] = self._reserve(entry["times"], length)
+        entry["times"][last:length] = times[overlap:]
+        entry["length"] = length
+        values = {}
+        for name, new in fresh.items():
+            held_values = self._reserve(entry["values"][name], length)
+            held_values[last:length] = new
+            entry["values"][name] = held_values
+            values[name] = held_values[start:length].copy()
+        return values
+
+    @staticmethod
+    def _reserve(buffer, length):
+        """buffer, or a copy at least twice as long if it is too short."""
+        if length <= len(buffer):
+            return buffer
+        grown = np.empty(max(length, 2 * len(buffer)), dtype=buffer.dtype)
+        grown[:len(buffer)] = buffer
+        return grown
+
+    @staticmethod
+    def _step(indicator, bars, i):
+        return indicator.step(
+            {field: column[i]
+             for field, column in bars.items()})
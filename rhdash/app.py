@@ -1,146 +1,331 @@
 """For building Dash app"""
+import sys
+
 import dash
-import dash_auth
 import dash_core_components as dcc
 import dash_html_components as html
-import pandas as pd
-import plotly.graph_objects as go
+from dash import callback_context
+from dash import no_update
+from dash.dependencies import ALL
 from dash.dependencies import Input
 from dash.dependencies import Output
-from numpy import NaN
-from plotly.subplots import make_subplots
-from rhdash.alg import ema_n_days
+from dash.dependencies import State
+from rhdash.config import apply_args
 from rhdash.config import fetch_config
-from rhdash.rh import get_day_data
-from rhdash.rh import get_fundamentals
-from rhdash.rh import get_name
-from rhdash.rh import get_symbol_by_url
+from rhdash.instruments import index_path
+from rhdash.instruments import instrument_index
+from rhdash.instruments import load_instruments
+from rhdash.metrics import add_metrics
+from rhdash.metrics import timed_callback
+from rhdash.rh import at_fork
+from rhdash.rh import configure_bars
+from rhdash.rh import configure_batch
+from rhdash.rh import configure_cache
+from rhdash.rh import configure_deadlines
+from rhdash.rh import configure_intervals
+from rhdash.rh import configure_pool
+from rhdash.rh import configure_provider
 from rhdash.rh import get_watchlist
-from rhdash.rh import get_week_data
-from rhdash.rh import get_year_data
 from rhdash.rh import login_using
+from rhdash.rh import year_closes
+from rhdash.startup import Startup
+from rhdash.startup import add_health_check
+from rhdash.startup import basic_auth_gate
+from rhdash.startup import mark
+from rhdash.startup import time_first_byte
+
+# rhdash.data, panels, prefetch and screener load pandas and plotly, which
+# takes longer than everything else at startup. They are imported where
+# they are first used, so fast start can bind the port without them.
+
+DEFAULT_EMA_DAYS = [10, 50, 100]
+
+# Seconds a callback waits for login before giving up
+STARTUP_WAIT = 60
+
+# Milliseconds between retries of a symbol's late or failed fetches
+PENDING_POLL = 2000
+
+# Seconds between checks for changes to the watchlist
+WATCHLIST_REFRESH = 300
+
+# Seconds between live updates of the day graph, unless dash.live.period
+LIVE_PERIOD = 30
+
+# Graph of each span and the line its Fibonacci levels are drawn with
+GRAPHS = {"day": "day-graph", "week": "week-graph", "year": "year-graphs"}
+FIB_LINES = {
+    "day": {
+        "color": "grey",
+        "width": 0.4
+    },
+    "week": {
+        "color": "grey"
+    },
+    "year": {
+        "color": "grey"
+    }
+}
+
+PERCENTAGES = [
+    0,
+    # .236,
+    .382,
+    .5,
+    .618,
+    # .786,
+    1,
+    # 1.236,
+    1.382,
+    1.5,
+    1.618,
+    # 1.786,
+    2,
+    # 2.236,
+    2.382,
+    2.5,
+    2.618,
+    # 2.786,
+    3
+]
+
+# Runs in the browser for every graph. A figure from the server gets the
+# Fibonacci levels as horizontal layout shapes and tick values on the price
+# rows. When only the Fibonacci controls change, the figure the graph
+# already shows is patched instead, so bars added live are kept and the
+# server is not asked. The graph element remembers which stored figure it
+# was drawn from; Dash 1.12 has no clientside callback_context to say so.
+FIBONACCI_OVERLAY = """
+function(figure, toggle, direction, high, low, graphId, line, percentages) {
+    var priceAxes = ["yaxis", "yaxis2"];
+    var levels = [];
+    high = parseFloat(high);
+    low = parseFloat(low);
+    if (toggle && !isNaN(high) && !isNaN(low)
+            && (direction === "Up" || direction === "Down")) {
+        levels = percentages.map(function(perc) {
+            var value = direction === "Up" ? low + (high - low) * perc
+                                           : high - (high - low) * perc;
+            return {perc: perc, value: value};
+        });
+    }
+    var values = levels.map(function(level) { return level.value; });
+
+    function shapes(current) {
+        return (current || []).filter(function(shape) {
+            return String(shape.name).indexOf("fib ") !== 0;
+        }).concat(levels.map(function(level) {
+            return {
+                type: "line", xref: "paper", yref: "y", x0: 0, x1: 1,
+                y0: level.value, y1: level.value, line: line,
+                name: "fib " + (level.perc * 100).toFixed(1) + " %"
+            };
+        }));
+    }
+
+    var root = document.getElementById(graphId);
+    var plot = root && (root.classList.contains("js-plotly-plot") ? root
+                        : root.querySelector(".js-plotly-plot"));
+    var base = figure;
+    if (root && root.fibSource === figure && plot && plot.data
+            && plot.layout) {
+        base = {data: plot.data, layout: plot.layout};
+    }
+    if (!base) {
+        return dash_clientside.no_update;
+    }
+    if (root) {
+        root.fibSource = figure;
+    }
+    var layout = Object.assign({}, base.layout);
+    layout.shapes = shapes(layout.shapes);
+    priceAxes.forEach(function(axis) {
+        var settings = Object.assign({}, layout[axis]);
+        if (values.length) {
+            settings.tickvals = values;
+        } else {
+            delete settings.tickvals;
+        }
+        layout[axis] = settings;
+    });
+    return Object.assign({}, base, {layout: layout});
+}
+"""
 
 
-def get_watchlist_table(config):
-    watchlist_data = get_watchlist()
-    if watchlist_data:
-        watchlist_symbols = []
-        for watch in watchlist_data:
-            watch_symbol = get_symbol_by_url(watch["instrument"])
-            if watch_symbol:
-                watchlist_symbols.append(watch_symbol)
-
-        watchlist_symbols = sorted(watchlist_symbols)
-        config["watchlist"] = watchlist_symbols
-
-        n_cols = 7
-        n_watches = len(watchlist_symbols)
-        if n_watches <= n_cols:
-            n_rows = 1
-        elif n_watches % n_cols == 0:
-            n_rows = int(n_watches / n_cols)
-        else:
-            n_rows = int(n_watches / n_cols) + 1
+def watchlist_symbols(config):
+    """Sorted watchlist symbols, also kept in config["watchlist"].
 
-        watchlist_headers = html.Tr([])
+    None if the watchlist could not be fetched.
+    """
+    watchlist_data = get_watchlist()
+    if not watchlist_data:
+        return None
+    index = instrument_index(index_path(config))
+    watch_symbols = index.resolve(
+        [watch["instrument"] for watch in watchlist_data])
 
-        t_rows = []
-        for r in range(n_rows):
-            t_row = []
-            for c in range(n_cols):
-                index = r + (c * n_rows)
-                if index < n_watches:
-                    this_sym = watchlist_symbols[index]
-                    t_row.append(
-                        html.Td(html.Button(this_sym, id=f"b_{this_sym}")))
+    config["watchlist"] = sorted(set(watch_symbols.values()))
+    return config["watchlist"]
 
-            t_rows.append(html.Tr(t_row))
 
-        watchlist_table = html.Table([watchlist_headers] + t_rows,
-                                     style={
-                                         "marginLeft": "auto",
-                                         "marginRight": "auto"
-                                     })
+def watchlist_table(symbols):
+    """Buttons for symbols, column by column, seven to a row."""
+    if not symbols:
+        return html.Table()
 
-        return watchlist_table
+    n_cols = 7
+    n_watches = len(symbols)
+    if n_watches <= n_cols:
+        n_rows = 1
+    elif n_watches % n_cols == 0:
+        n_rows = int(n_watches / n_cols)
     else:
-        return html.Table()
+        n_rows = int(n_watches / n_cols) + 1
+
+    watchlist_headers = html.Tr([])
+
+    t_rows = []
+    for r in range(n_rows):
+        t_row = []
+        for c in range(n_cols):
+            index = r + (c * n_rows)
+            if index < n_watches:
+                this_sym = symbols[index]
+                t_row.append(
+                    html.Td(
+                        html.Button(this_sym,
+                                    id={
+                                        "type": "watch-button",
+                                        "symbol": this_sym
+                                    })))
+
+        t_rows.append(html.Tr(t_row))
+
+    return html.Table([watchlist_headers] + t_rows,
+                      style={
+                          "marginLeft": "auto",
+                          "marginRight": "auto"
+                      })
+
+
+def fibonacci_controls(span):
+    """Fibonacci toggle, direction, high and low for span's graph."""
+    return html.Div(children=[
+        dcc.RadioItems(id=f"{span}-fib-radio",
+                       options=[{
+                           "label": "Fibonacci Off",
+                           "value": False
+                       }, {
+                           "label": "Fibonacci On",
+                           "value": True
+                       }],
+                       value=None,
+                       labelStyle={"display": "inline-block"}),
+        dcc.RadioItems(id=f"{span}-fib-direction-radio",
+                       options=[{
+                           "label": "Extension",
+                           "value": "Up"
+                       }, {
+                           "label": "Retracement",
+                           "value": "Down"
+                       }],
+                       value=None,
+                       labelStyle={"display": "inline-block"}), " High: ",
+        dcc.Input(id=f"{span}-fib-high-input", value="", type="float"),
+        " Low: ",
+        dcc.Input(id=f"{span}-fib-low-input", value="", type="float"),
+        dcc.Store(id=f"{span}-fib-line", data=FIB_LINES[span])
+    ])
+
 
+def setup_dash(config, startup, fast_start=False):
+    """Set up dashboard server.
 
-def setup_dash(config):
-    """Set up dashboard server."""
+    With fast_start, the watchlist is left as a placeholder until startup
+    is ready and the callbacks fill it in.
+    """
 
     dash_config = config["dash"]
     external_stylesheets = ["https://codepen.io/chriddyp/pen/bWLwgP.css"]
     app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
+    add_metrics(app.server)
+
     if "creds" in dash_config:
         creds = dash_config["creds"]
         if "user" in creds and "password" in creds:
             if creds["user"] != "" and creds["password"] != "":
-                dash_auth.BasicAuth(app, {creds["user"]: creds["password"]})
+                # One gate for every route, /metrics included, either way
+                basic_auth_gate(app.server,
+                                {creds["user"]: creds["password"]})
+
+    add_health_check(app.server, startup)
+    time_first_byte(app.server)
+
+    live_config = dash_config["live"] if "live" in dash_config else {}
+    live_period = live_config.get("period", LIVE_PERIOD)
+
+    watchlist_refresh = dash_config.get("watchlist_refresh",
+                                        WATCHLIST_REFRESH)
+
+    if fast_start:
+        symbols = None
+        watchlist = html.Div("Loading watchlist...")
+    else:
+        symbols = watchlist_symbols(config)
+        watchlist = watchlist_table(symbols)
 
     app.layout = html.Div([
-        html.Div(id="watchlist-table", children=get_watchlist_table(config)),
+        html.Div(id="watchlist-table", children=watchlist),
+        dcc.Store(id="watchlist-symbols", data=symbols),
+        dcc.Interval(id="watchlist-poll", interval=watchlist_refresh * 1000),
+        dcc.Interval(id="startup-poll", interval=500, disabled=not fast_start),
+        html.Details([
+            html.Summary("Screener"),
+            html.Button("Refresh", id="screener-refresh"),
+            html.Div(id="screener")
+        ]),
         html.Div(children=[html.Br()]),
         html.Div(children="Symbol:"),
-        dcc.Input(id="symbol", value="", type="text"),
+        dcc.Input(id="symbol",
+                  value="",
+                  type="text",
+                  list="symbol-options",
+                  autoComplete="off"),
+        html.Datalist(id="symbol-options"),
+        html.Span(id="symbol-error", style={"marginLeft": "1em"}),
+        dcc.Store(id="symbol-choice"),
+        dcc.Store(id="symbol-counts"),
+        dcc.Store(id="symbol-data"),
+        dcc.Interval(id="pending-poll", interval=PENDING_POLL, disabled=True),
         html.Div(children=[html.Br()]),
         html.H1(id="heading", children="", style={"textAlign": "center"}),
         html.Div(id="description-blob", style={"textAlign": "center"}),
         html.Div(id="fundamentals-table"),
         html.Div(children=[html.Br(), html.Br()]),
         html.Div(children=[
-            dcc.RadioItems(id="day-fib-radio",
+            dcc.RadioItems(id="day-live-radio",
                            options=[{
-                               "label": "Fibonacci Off",
+                               "label": "Live Off",
                                "value": False
                            }, {
-                               "label": "Fibonacci On",
+                               "label": "Live On",
                                "value": True
                            }],
-                           value=None,
+                           value=False,
                            labelStyle={"display": "inline-block"}),
-            dcc.RadioItems(id="day-fib-direction-radio",
-                           options=[{
-                               "label": "Extension",
-                               "value": "Up"
-                           }, {
-                               "label": "Retracement",
-                               "value": "Down"
-                           }],
-                           value=None,
-                           labelStyle={"display": "inline-block"}), " High: ",
-            dcc.Input(id="day-fib-high-input", value="", type="float"),
-            " Low: ",
-            dcc.Input(id="day-fib-low-input", value="", type="float")
+            dcc.Interval(id="day-live-interval",
+                         interval=live_period * 1000,
+                         disabled=True),
+            dcc.Store(id="day-live-base"),
+            dcc.Store(id="day-live-state")
         ]),
+        fibonacci_controls("day"),
+        dcc.Store(id="day-figure"),
         dcc.Graph(id="day-graph"),
-        html.Div(children=[
-            dcc.RadioItems(id="week-fib-radio",
-                           options=[{
-                               "label": "Fibonacci Off",
-                               "value": False
-                           }, {
-                               "label": "Fibonacci On",
-                               "value": True
-                           }],
-                           value=None,
-                           labelStyle={"display": "inline-block"}),
-            dcc.RadioItems(id="week-fib-direction-radio",
-                           options=[{
-                               "label": "Extension",
-                               "value": "Up"
-                           }, {
-                               "label": "Retracement",
-                               "value": "Down"
-                           }],
-                           value=None,
-                           labelStyle={"display": "inline-block"}), " High: ",
-            dcc.Input(id="week-fib-high-input", value="", type="float"),
-            " Low: ",
-            dcc.Input(id="week-fib-low-input", value="", type="float")
-        ]),
+        fibonacci_controls("week"),
+        dcc.Store(id="week-figure"),
         dcc.Graph(id="week-graph"),
         html.Div(children=[
             dcc.RadioItems(id="year-ema-radio",
@@ -154,46 +339,72 @@ def setup_dash(config):
                            value=None,
                            labelStyle={"display": "inline-block"})
         ]),
-        html.Div(children=[
-            dcc.RadioItems(id="year-fib-radio",
-                           options=[{
-                               "label": "Fibonacci Off",
-                               "value": False
-                           }, {
-                               "label": "Fibonacci On",
-                               "value": True
-                           }],
-                           value=None,
-                           labelStyle={"display": "inline-block"}),
-            dcc.RadioItems(id="year-fib-direction-radio",
-                           options=[{
-                               "label": "Extension",
-                               "value": "Up"
-                           }, {
-                               "label": "Retracement",
-                               "value": "Down"
-                           }],
-                           value=None,
-                           labelStyle={"display": "inline-block"}), " High: ",
-            dcc.Input(id="year-fib-high-input", value="", type="float"),
-            " Low: ",
-            dcc.Input(id="year-fib-low-input", value="", type="float")
-        ]),
-        dcc.Graph(id="year-graphs")
+        fibonacci_controls("year"),
+        dcc.Store(id="year-figure"),
+        dcc.Graph(id="year-graphs"),
+        dcc.Store(id="fib-percentages", data=PERCENTAGES)
     ])
 
     return app
 
 
-def init_using(config):
-    """Do some initialization"""
+def connect_using(config):
+    """Configure upstream access and log in."""
     robinhood_config = config["robinhood"]
+    configure_provider(robinhood_config)
+    configure_cache(robinhood_config)
+    configure_bars(robinhood_config)
+    configure_intervals(robinhood_config)
+    configure_deadlines(robinhood_config)
+    configure_pool(robinhood_config)
+    configure_batch(robinhood_config)
     login_using(robinhood_config)
-    return setup_dash(config)
 
 
-def create_app(arguments=None):
-    configuration = fetch_config(arguments)
+def load_panels(config):
+    """Import the data and plotting modules and apply their config."""
+    from rhdash.live import configure_live
+    from rhdash.panels import configure_figures
+    configure_figures(config["dash"])
+    configure_live(config["dash"])
+    mark("panels_loaded")
+
+
+def prefetch_using(config, leader=False):
+    from rhdash.prefetch import start_prefetch
+    start_prefetch(config, leader)
+
+
+def init_using(config):
+    """Do some initialization"""
+    startup = Startup(config,
+                      [connect_using, load_instruments, load_panels]).run()
+    if startup.error:
+        sys.exit(1)
+    return setup_dash(config, startup), startup
+
+
+def fast_init_using(config):
+    """Serve a placeholder layout now and do the rest in the background."""
+    startup = Startup(config, [
+        connect_using, load_instruments, watchlist_symbols, load_panels,
+        prefetch_using
+    ])
+    app = setup_dash(config, startup, fast_start=True)
+    return app, startup.start()
+
+
+def create_app(arguments=None, prefork=False):
+    """Build the Dash app.
+
+    With prefork set, the app is built once in a master process and then
+    forked into workers, which must call rh.after_fork(). Workers share
+    cached responses through SQLite and only one of them prefetches.
+
+    With dash.fast_start set instead, the app is returned before login and
+    the watchlist are ready.
+    """
+    configuration = apply_args(fetch_config(arguments), arguments)
     configuration["symbol"] = ""
 
     if "robinhood" not in configuration:
@@ -201,391 +412,280 @@ def create_app(arguments=None):
     if "dash" not in configuration:
         configuration["dash"] = {}
 
-    app = init_using(configuration)
+    if prefork:
+        robinhood_config = configuration["robinhood"]
+        cache_config = robinhood_config.setdefault("cache", {})
+        cache_config["shared"] = dict(cache_config.get("shared", {}),
+                                      enabled=True)
 
-    rows = 2
-
-    watchlist_inputs = []
-    for w in configuration["watchlist"]:
-        watchlist_inputs.append(Input(f"b_{w}", "n_clicks_timestamp"))
-        watchlist_inputs.append(Input(f"b_{w}", "children"))
-
-    @app.callback(Output("symbol", "value"), watchlist_inputs)
-    def update_from_watchlist(*inputs):
-        buttons = {
-            str(inputs[i * 2]): inputs[i * 2 + 1]
-            for i in range(int(len(inputs) / 2)) if inputs[i * 2] is not None
+    if configuration["dash"].get("fast_start") and not prefork:
+        app, startup = fast_init_using(configuration)
+    else:
+        app, startup = init_using(configuration)
+        if prefork:
+            at_fork(lambda: prefetch_using(configuration, leader=True))
+        else:
+            prefetch_using(configuration)
+
+    # Runs in the browser: a symbol is only chosen on Enter or a watchlist
+    # click, and a click costs the server nothing however long the
+    # watchlist is. The choice triggers update_symbol. Dash 1.12 has no
+    # clientside callback_context, so the trigger is the count that grew
+    # since the counts kept in symbol-counts. A redrawn watchlist starts
+    # its buttons at zero and the callback records that too.
+    app.clientside_callback(
+        """
+        function(nSubmit, clicks, typed, symbols, counts) {
+            var noUpdate = dash_clientside.no_update;
+            var last = counts || {submit: 0, clicks: {}};
+            counts = {submit: nSubmit || 0, clicks: {}};
+            var clicked = null;
+            (symbols || []).forEach(function(symbol, i) {
+                counts.clicks[symbol] = clicks[i] || 0;
+                if (counts.clicks[symbol] > (last.clicks[symbol] || 0)) {
+                    clicked = symbol;
+                }
+            });
+            if (counts.submit > last.submit) {
+                return [typed, noUpdate, counts];
+            }
+            if (clicked) {
+                return [clicked, clicked, counts];
+            }
+            return [noUpdate, noUpdate, counts];
         }
-        if len(buttons) > 0:
-            button_pressed_index = max(buttons.keys())
-            return buttons[f"{button_pressed_index}"]
-        return configuration["symbol"]
+        """, [
+            Output("symbol-choice", "data"),
+            Output("symbol", "value"),
+            Output("symbol-counts", "data")
+        ], [
+            Input("symbol", "n_submit"),
+            Input({
+                "type": "watch-button",
+                "symbol": ALL
+            }, "n_clicks")
+        ], [
+            State("symbol", "value"),
+            State({
+                "type": "watch-button",
+                "symbol": ALL
+            }, "children"),
+            State("symbol-counts", "data")
+        ])
+
+    @app.callback(Output("symbol-options", "children"),
+                  [Input("symbol", "value")])
+    @timed_callback
+    def update_symbol_options(typed):
+        if not typed or not startup.ready.is_set():
+            return []
+        index = instrument_index(index_path(configuration))
+        options = []
+        for symbol, name, tradeable in index.complete(typed):
+            label = name or ""
+            if tradeable == 0:
+                label += " (not tradeable)"
+            options.append(html.Option(label, value=symbol))
+        return options
+
+    def ema_days():
+        return configuration["robinhood"][
+            "ema_days"] if "ema_days" in configuration[
+                "robinhood"] else DEFAULT_EMA_DAYS
+
+    @app.callback(Output("screener", "children"),
+                  [Input("screener-refresh", "n_clicks")],
+                  prevent_initial_call=True)
+    @timed_callback
+    def update_screener(n_clicks):
+        from rhdash.panels import screener_table
+        from rhdash.screener import screen
+        if not startup.wait(STARTUP_WAIT):
+            return html.Div()
+        try:
+            closes = year_closes(configuration.get("watchlist", []))
+            return screener_table(screen(closes, ema_days()), ema_days())
+        except Exception as e:
+            print("Could not screen the watchlist.")
+            print(e)
+        return html.Div()
 
     @app.callback([
-        Output("watchlist-table", "children"),
-        Output("heading", "children"),
-        Output("description-blob", "children"),
-        Output("fundamentals-table", "children"),
-        Output("day-graph", "figure"),
-        Output("week-graph", "figure"),
-        Output("year-graphs", "figure")
+        Output("symbol-data", "data"),
+        Output("pending-poll", "disabled"),
+        Output("symbol-error", "children")
     ], [
-        Input("symbol", "value"),
-        Input("day-fib-radio", "value"),
-        Input("day-fib-direction-radio", "value"),
-        Input("day-fib-high-input", "value"),
-        Input("day-fib-low-input", "value"),
-        Input("week-fib-radio", "value"),
-        Input("week-fib-direction-radio", "value"),
-        Input("week-fib-high-input", "value"),
-        Input("week-fib-low-input", "value"),
-        Input("year-ema-radio", "value"),
-        Input("year-fib-radio", "value"),
-        Input("year-fib-direction-radio", "value"),
-        Input("year-fib-high-input", "value"),
-        Input("year-fib-low-input", "value")
-    ])
-    def update_figure(symbol, day_fib_toggle, day_fib_direction, day_fib_high,
-                      day_fib_low, week_fib_toggle, week_fib_direction,
-                      week_fib_high, week_fib_low, year_ema_radio_val,
-                      year_fib_toggle, year_fib_direction, year_fib_high,
-                      year_fib_low):
-        symbol = str(symbol).strip().upper()
+        Input("symbol-choice", "data"),
+        Input("pending-poll", "n_intervals")
+    ], [State("symbol-data", "data")])
+    @timed_callback
+    def update_symbol(symbol, n_intervals, symbol_data):
+        from rhdash.data import load_symbol
+        from rhdash.prefetch import touch
+        symbol = str(symbol or "").strip().upper()
+        if not startup.wait(STARTUP_WAIT):
+            symbol = ""
+        index = instrument_index(index_path(configuration))
+        if symbol and index.is_full() and not index.knows(symbol):
+            return no_update, no_update, f"Unknown symbol '{symbol}'."
         configuration["symbol"] = symbol
-        description = ""
-        fundamentals_table = html.Table()
-        day_fig = make_subplots(rows=rows,
-                                cols=1,
-                                shared_xaxes=True,
-                                vertical_spacing=0.01,
-                                row_titles=["", ""])
-
-        week_fig = make_subplots(rows=rows,
-                                 cols=1,
-                                 shared_xaxes=True,
-                                 vertical_spacing=0.01,
-                                 row_titles=["", ""])
-
-        fig = make_subplots(rows=rows,
-                            cols=1,
-                            shared_xaxes=True,
-                            vertical_spacing=0.01,
-                            row_titles=["", ""])
-
-        try:
-            name = get_name(symbol) if symbol != "" else ""
-            heading = f"{name} ({symbol})" if len(name) > 0 else ""
-
-            fundamentals_data = get_fundamentals(symbol)
-            fundamentals_df = pd.DataFrame(fundamentals_data)
-            fundamentals_df_values = fundamentals_df.iloc[0]
-
-            fundamentals = {}
-            fundamentals[
-                "OPEN"] = f"{float(fundamentals_df_values['open']):,.4f}"
-            fundamentals[
-                "HIGH"] = f"{float(fundamentals_df_values['high']):,.4f}"
-            fundamentals[
-                "LOW"] = f"{float(fundamentals_df_values['low']):,.4f}"
-            fundamentals[
-                "MARKET CAP"] = f"${float(fundamentals_df_values['market_cap']):,.0f}"
-            fundamentals[
-                "AVG VOL"] = f"{float(fundamentals_df_values['average_volume']):,.0f}"
-            fundamentals[
-                "CURR VOL"] = f"{float(fundamentals_df_values['volume']):,.0f}"
-
-            description = [
-                html.Br(),
-                html.P(f"{fundamentals_df_values['description']}"),
-                html.Br(),
-                html.Br()
-            ]
-
-            day_data = get_day_data(symbol)
-            day_df = pd.DataFrame(day_data)
-            day_df["begins_at"] = pd.to_datetime(day_df["begins_at"])
-            day_df["begins_at"] = day_df["begins_at"].dt.tz_convert(
-                'US/Eastern')
-
-            week_data = get_week_data(symbol)
-            week_df = pd.DataFrame(week_data)
-            week_df["begins_at"] = pd.to_datetime(week_df["begins_at"])
-            week_df["begins_at"] = week_df["begins_at"].dt.tz_convert(
-                'US/Eastern')
-
-            year_data = get_year_data(symbol)
-            df = pd.DataFrame(year_data)
-            df["begins_at"] = pd.to_datetime(df["begins_at"])
-
-            float_cols = [
-                "open_price", "close_price", "high_price", "low_price"
-            ]
-
-            for col in float_cols:
-                day_df[col] = day_df[col].astype(float)
-                week_df[col] = week_df[col].astype(float)
-                df[col] = df[col].astype(float)
-
-            ema_days = configuration["robinhood"][
-                "ema_days"] if "ema_days" in configuration["robinhood"] else [
-                    10, 50, 100
-                ]
-
-            if len(ema_days) > 3:
-                ema_days = ema_days[:3]
-
-            day_close_price_data = {
-                "x": day_df["begins_at"],
-                "y": day_df["close_price"],
-                "name": "close_price"
-            }
-
-            week_close_price_data = {
-                "x": week_df["begins_at"],
-                "y": week_df["close_price"],
-                "name": "close_price"
-            }
-
-            close_price_data = {
-                "x": df["begins_at"],
-                "y": df["close_price"],
-                "name": "close_price"
-            }
+        triggered = callback_context.triggered
+        polled = triggered and triggered[0]["prop_id"].startswith(
+            "pending-poll")
+        if not polled:
+            touch(symbol)
+        frames = load_symbol(symbol)
+        late = sorted(frames["late"])
+        if polled and symbol_data and symbol_data.get("late") == late:
+            return no_update, not late, no_update
+        return {
+            "symbol": symbol,
+            "version": frames["version"],
+            "late": late
+        }, not late, ""
 
-            day_candle_data = {
-                "x": day_df["begins_at"],
-                "open": day_df["open_price"],
-                "high": day_df["high_price"],
-                "low": day_df["low_price"],
-                "close": day_df["close_price"],
-                "name": symbol
-            }
+    @app.callback([
+        Output("watchlist-table", "children"),
+        Output("watchlist-symbols", "data"),
+        Output("startup-poll", "disabled")
+    ], [
+        Input("startup-poll", "n_intervals"),
+        Input("watchlist-poll", "n_intervals")
+    ], [State("watchlist-symbols", "data")])
+    @timed_callback
+    def update_watchlist(startup_polls, watchlist_polls, shown):
+        if not startup.ready.is_set():
+            return no_update, no_update, False
+        if startup.error:
+            return html.Div(f"Could not start: {startup.error}"), None, True
+        symbols = watchlist_symbols(configuration)
+        if symbols is None and shown is None:
+            return html.Table(), None, True
+        if symbols is None or symbols == shown:
+            return no_update, no_update, True
+        return watchlist_table(symbols), symbols, True
 
-            week_candle_data = {
-                "x": week_df["begins_at"],
-                "open": week_df["open_price"],
-                "high": week_df["high_price"],
-                "low": week_df["low_price"],
-                "close": week_df["close_price"],
-                "name": symbol
-            }
+    @app.callback([
+        Output("heading", "children"),
+        Output("description-blob", "children"),
+        Output("fundamentals-table", "children")
+    ], [Input("symbol-data", "data")])
+    @timed_callback
+    def update_heading(symbol_data):
+        from rhdash.data import symbol_frames
+        from rhdash.panels import heading_panel
+        symbol = symbol_data["symbol"] if symbol_data else ""
+        try:
+            return heading_panel(symbol_frames(symbol))
+        except Exception as e:
+            print(f"Could not update fundamentals for '{symbol}'.")
+            print(e)
+        return "", "", html.Table()
 
-            candle_data = {
-                "x": df["begins_at"],
-                "open": df["open_price"],
-                "high": df["high_price"],
-                "low": df["low_price"],
-                "close": df["close_price"],
-                "name": symbol
-            }
+    @app.callback([
+        Output("day-figure", "data"),
+        Output("day-live-base", "data")
+    ], [Input("symbol-data", "data")])
+    @timed_callback
+    def update_day_graph(symbol_data):
+        from rhdash.data import symbol_frames
+        from rhdash.live import extendable
+        from rhdash.live import live_base
+        from rhdash.panels import day_figure
+        from rhdash.panels import empty_figure
+        from rhdash.panels import memoized_figure
+        symbol = symbol_data["symbol"] if symbol_data else ""
+        try:
+            frames = symbol_frames(symbol)
+            figure = memoized_figure(frames, "day", (),
+                                     lambda: day_figure(frames))
+            return extendable(figure), live_base(frames, figure)
+        except Exception as e:
+            print(f"Could not update day graph for '{symbol}'.")
+            print(e)
+        return empty_figure(), None
 
-            fundamentals_headers = html.Tr(
-                [html.Th(field) for field in fundamentals])
-            fundamentals_row = html.Tr(
-                [html.Td(fundamentals[field]) for field in fundamentals])
-            fundamentals_table = html.Table([fundamentals_headers] +
-                                            [fundamentals_row],
-                                            style={
-                                                "marginLeft": "auto",
-                                                "marginRight": "auto"
-                                            })
-
-            day_close_price = go.Scatter(day_close_price_data)
-            day_candlestick = go.Candlestick(day_candle_data)
-
-            week_close_price = go.Scatter(week_close_price_data)
-            week_candlestick = go.Candlestick(week_candle_data)
-
-            close_price = go.Scatter(close_price_data)
-            candlestick = go.Candlestick(candle_data)
-
-            day_fig.append_trace(day_close_price, 1, 1)
-            day_fig.append_trace(day_candlestick, 2, 1)
-
-            percentages = [
-                0,
-                # .236,
-                .382,
-                .5,
-                .618,
-                # .786,
-                1,
-                # 1.236,
-                1.382,
-                1.5,
-                1.618,
-                # 1.786,
-                2,
-                # 2.236,
-                2.382,
-                2.5,
-                2.618,
-                # 2.786,
-                3
-            ]
-
-            if day_fib_toggle and day_fib_high and day_fib_low:
-                day_fib_data = {}
-                perc_vals = []
-                for perc in sorted(
-                        percentages,
-                        reverse=True if day_fib_direction == "Up" else False):
-
-                    if day_fib_direction == "Up":
-                        perc_val = float(day_fib_low) + (
-                            float(day_fib_high) - float(day_fib_low)) * perc
-                    elif day_fib_direction == "Down":
-                        perc_val = float(day_fib_high) - (
-                            float(day_fib_high) - float(day_fib_low)) * perc
-                    else:
-                        perc_val = NaN
-
-                    day_fib_data[f"{perc}"] = {
-                        "x": day_df["begins_at"],
-                        "y":
-                        [perc_val for i in range(len(day_df["begins_at"]))],
-                        "name": f"{perc * 100:.1f} %"
-                    }
-                    perc_line = go.Scatter(day_fib_data[f"{perc}"],
-                                           line=dict(color="grey", width=0.4))
-                    day_fig.append_trace(perc_line, 1, 1)
-                    perc_vals.append(perc_val)
-                day_fig.update_yaxes(tickvals=perc_vals)
-
-            week_fig.append_trace(week_close_price, 1, 1)
-            week_fig.append_trace(week_candlestick, 2, 1)
-
-            if week_fib_toggle and week_fib_high and week_fib_low:
-                week_fib_data = {}
-                perc_vals = []
-                for perc in sorted(
-                        percentages,
-                        reverse=True if week_fib_direction == "Up" else False):
-
-                    if week_fib_direction == "Up":
-                        perc_val = float(week_fib_low) + (
-                            float(week_fib_high) - float(week_fib_low)) * perc
-                    elif week_fib_direction == "Down":
-                        perc_val = float(week_fib_high) - (
-                            float(week_fib_high) - float(week_fib_low)) * perc
-                    else:
-                        perc_val = NaN
-
-                    week_fib_data[f"{perc}"] = {
-                        "x": week_df["begins_at"],
-                        "y":
-                        [perc_val for i in range(len(week_df["begins_at"]))],
-                        "name": f"{perc * 100:.1f} %"
-                    }
-                    perc_line = go.Scatter(week_fib_data[f"{perc}"],
-                                           line=dict(color="grey"))
-                    week_fig.append_trace(perc_line, 1, 1)
-                    perc_vals.append(perc_val)
-                week_fig.update_yaxes(tickvals=perc_vals)
-
-            fig.append_trace(close_price, 1, 1)
-            fig.append_trace(candlestick, 2, 1)
-
-            if year_fib_toggle and year_fib_high and year_fib_low:
-                fib_data = {}
-                perc_vals = []
-                for perc in sorted(
-                        percentages,
-                        reverse=True if year_fib_direction == "Up" else False):
-
-                    if year_fib_direction == "Up":
-                        perc_val = float(year_fib_low) + (
-                            float(year_fib_high) - float(year_fib_low)) * perc
-                    elif year_fib_direction == "Down":
-                        perc_val = float(year_fib_high) - (
-                            float(year_fib_high) - float(year_fib_low)) * perc
-                    else:
-                        perc_val = NaN
-
-                    fib_data[f"{perc}"] = {
-                        "x": df["begins_at"],
-                        "y": [perc_val for i in range(len(df["begins_at"]))],
-                        "name": f"{perc * 100:.1f} %"
-                    }
-                    perc_line = go.Scatter(fib_data[f"{perc}"],
-                                           line=dict(color="grey"))
-                    fig.append_trace(perc_line, 1, 1)
-                    perc_vals.append(perc_val)
-                fig.update_yaxes(tickvals=perc_vals)
-
-            if year_ema_radio_val:
-                for n_days in ema_days:
-                    df[f"ema_{n_days}"] = NaN
-                    df.at[n_days - 1, f"ema_{n_days}"] = df.iloc[:n_days][
-                        "close_price"].sum() / n_days
-
-                    for i, row in df.iloc[n_days:].iterrows():
-                        df.at[i, f"ema_{n_days}"] = ema_n_days(
-                            n_days, row["close_price"],
-                            df.iloc[i - 1][f"ema_{n_days}"])
-
-                for i, n_days in enumerate(ema_days):
-                    ema_trace = go.Scatter(x=df["begins_at"],
-                                           y=df[f"ema_{n_days}"],
-                                           name=f"ema_{n_days}")
-
-                    fig.append_trace(ema_trace, 1, 1)
-
-            graph_height = 420
-            graph_font_size = 10
-
-            day_fig.update_xaxes()
-            day_fig.update_yaxes(zeroline=True,
-                                 zerolinewidth=1,
-                                 zerolinecolor="Grey")
-            day_fig.update_layout(title=f"{heading} - Day",
-                                  hovermode="x unified",
-                                  showlegend=False,
-                                  height=(graph_height * rows),
-                                  xaxis=dict(type="category"),
-                                  font=dict(family="Courier New, monospace",
-                                            size=graph_font_size,
-                                            color="#7f7f7f"))
-
-            week_fig.update_xaxes(rangebreaks=[
-                dict(bounds=["sat", "mon"]),
-                dict(pattern="hour", bounds=[16, 9.5])
-            ])
-            week_fig.update_yaxes(zeroline=True,
-                                  zerolinewidth=1,
-                                  zerolinecolor="Grey")
-            week_fig.update_layout(title=f"{heading} - Week",
-                                   hovermode="x unified",
-                                   showlegend=False,
-                                   height=(graph_height * rows),
-                                   xaxis=dict(type="category"),
-                                   font=dict(family="Courier New, monospace",
-                                             size=graph_font_size,
-                                             color="#7f7f7f"))
-
-            fig.update_xaxes(rangebreaks=[dict(bounds=["sat", "mon"])])
-            fig.update_yaxes(zeroline=True,
-                             zerolinewidth=1,
-                             zerolinecolor="Grey")
-            fig.update_layout(title=f"{heading} - Year",
-                              hovermode="x unified",
-                              showlegend=False,
-                              height=(graph_height * rows),
-                              font=dict(family="Courier New, monospace",
-                                        size=graph_font_size,
-                                        color="#7f7f7f"))
+    @app.callback(Output("day-live-interval", "disabled"),
+                  [Input("day-live-radio", "value")])
+    def toggle_live(live):
+        return not live
 
+    @app.callback([
+        Output("day-graph", "extendData"),
+        Output("day-live-state", "data")
+    ], [Input("day-live-interval", "n_intervals")], [
+        State("day-live-base", "data"),
+        State("day-live-state", "data")
+    ])
+    @timed_callback
+    def update_day_live(n_intervals, base, state):
+        from rhdash.live import live_update
+        symbol = base["symbol"] if base else ""
+        try:
+            extend, state = live_update(base, state)
+            if extend is not None:
+                return extend, state
         except Exception as e:
-            print(f"Could not update data for '{symbol}'.")
+            print(f"Could not update day graph live for '{symbol}'.")
             print(e)
+        return no_update, no_update
+
+    @app.callback(Output("week-figure", "data"),
+                  [Input("symbol-data", "data")])
+    @timed_callback
+    def update_week_graph(symbol_data):
+        from rhdash.data import symbol_frames
+        from rhdash.panels import empty_figure
+        from rhdash.panels import memoized_figure
+        from rhdash.panels import week_figure
+        symbol = symbol_data["symbol"] if symbol_data else ""
+        try:
+            frames = symbol_frames(symbol)
+            return memoized_figure(frames, "week", (),
+                                   lambda: week_figure(frames))
+        except Exception as e:
+            print(f"Could not update week graph for '{symbol}'.")
+            print(e)
+        return empty_figure()
 
-        return get_watchlist_table(
-            configuration
-        ), heading, description, fundamentals_table, day_fig, week_fig, fig
+    @app.callback(Output("year-figure", "data"), [
+        Input("symbol-data", "data"),
+        Input("year-ema-radio", "value")
+    ])
+    @timed_callback
+    def update_year_graph(symbol_data, ema_toggle):
+        from rhdash.data import symbol_frames
+        from rhdash.panels import empty_figure
+        from rhdash.panels import memoized_figure
+        from rhdash.panels import year_figure
+        symbol = symbol_data["symbol"] if symbol_data else ""
+        year_ema_days = ema_days()
+        try:
+            frames = symbol_frames(symbol)
+            return memoized_figure(
+                frames, "year", (ema_toggle, tuple(year_ema_days)),
+                lambda: year_figure(frames, ema_toggle, year_ema_days))
+        except Exception as e:
+            print(f"Could not update year graph for '{symbol}'.")
+            print(e)
+        return empty_figure()
+
+    for span, graph in GRAPHS.items():
+        app.clientside_callback(FIBONACCI_OVERLAY, Output(graph, "figure"), [
+            Input(f"{span}-figure", "data"),
+            Input(f"{span}-fib-radio", "value"),
+            Input(f"{span}-fib-direction-radio", "value"),
+            Input(f"{span}-fib-high-input", "value"),
+            Input(f"{span}-fib-low-input", "value")
+        ], [
+            State(graph, "id"),
+            State(f"{span}-fib-line", "data"),
+            State("fib-percentages", "data")
+        ])
 
     return app
 
 
-def create_server():
-    app = create_app()
+def create_server(prefork=False):
+    app = create_app(prefork=prefork)
     return app.server
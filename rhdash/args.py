@@ -38,11 +38,27 @@ def setup_optional(optional):
                           action="help",
                           default=SUPPRESS,
                           help="Show this help message and exit.")
+    optional.add_argument("--fast-start",
+                          action="store_true",
+                          default=None,
+                          help="Serve at once and log in in the background.")
+    optional.add_argument("--fixtures",
+                          default=None,
+                          type=str,
+                          help="Directory for recorded responses.")
+    optional.add_argument("--latency",
+                          default=None,
+                          type=float,
+                          help="Seconds of synthetic latency when replaying.")
     optional.add_argument("-p",
                           "--port",
                           default=8050,
                           type=int,
                           help="Port for default server.")
+    optional.add_argument("--provider",
+                          default=None,
+                          choices=["live", "record", "replay"],
+                          help="Where market data comes from.")
     optional.add_argument("--version",
                           action="version",
                           version=f"%(prog)s {__version__}",
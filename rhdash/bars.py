@@ -0,0 +1,284 @@
+"""Local OHLC bar store, synced incrementally from upstream."""
+import calendar
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from os.path import dirname
+from os.path import join
+
+from rhdash.config import DATA_DIR
+
+DEFAULT_BARS_PATH = join(DATA_DIR, "bars.sqlite")
+
+STAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+DAY = 24 * 60 * 60
+
+# How far back each upstream span reaches
+SPAN_SECONDS = {
+    "day": DAY,
+    "week": 7 * DAY,
+    "month": 31 * DAY,
+    "3month": 92 * DAY,
+    "year": 366 * DAY,
+    "5year": 5 * 366 * DAY
+}
+
+# Spans that can be requested for each interval, shortest first
+INTERVAL_SPANS = {
+    "5minute": ["day", "week"],
+    "10minute": ["day", "week"],
+    "hour": ["week", "month", "3month"],
+    "day": ["week", "month", "3month", "year", "5year"],
+    "week": ["year", "5year"]
+}
+
+# Symbols per query, well under SQLite's bound parameter limit
+QUERY_CHUNK = 500
+
+# Seconds a sync stays good before upstream is asked again
+DEFAULT_FRESH_FOR = {"5minute": 30, "10minute": 5 * 60, "day": 15 * 60}
+
+COLUMNS = [
+    "begins_at", "open_price", "close_price", "high_price", "low_price",
+    "volume", "session", "interpolated"
+]
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS bars (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        begins_at TEXT NOT NULL,
+        open_price REAL,
+        close_price REAL,
+        high_price REAL,
+        low_price REAL,
+        volume INTEGER,
+        session TEXT,
+        interpolated INTEGER,
+        PRIMARY KEY (symbol, interval, begins_at)
+    ) WITHOUT ROWID
+    """, """
+    CREATE TABLE IF NOT EXISTS syncs (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        synced_at REAL NOT NULL,
+        PRIMARY KEY (symbol, interval)
+    )
+    """, """
+    CREATE TABLE IF NOT EXISTS reaches (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        span TEXT NOT NULL,
+        PRIMARY KEY (symbol, interval)
+    )
+    """
+]
+
+
+def to_seconds(stamp):
+    return calendar.timegm(time.strptime(stamp, STAMP_FORMAT))
+
+
+def to_stamp(seconds):
+    return datetime.utcfromtimestamp(seconds).strftime(STAMP_FORMAT)
+
+
+def catch_up_span(interval, gap, span):
+    """Shortest span for interval that still reaches gap seconds back."""
+    for candidate in INTERVAL_SPANS.get(interval, []):
+        if SPAN_SECONDS[candidate] > gap:
+            if SPAN_SECONDS[candidate] >= SPAN_SECONDS[span]:
+                return span
+            return candidate
+    return span
+
+
+class BarStore:
+    """Bars keyed by (symbol, interval) in SQLite.
+
+    Upstream is only asked for the bars after the last one stored, using
+    the shortest span that covers the gap, and those are merged in. The
+    newest stored bar is overwritten, since it may have been revised.
+
+    The widest span fetched in full is kept as the reach of the bars, so
+    bars first stored for a short span are fetched again in full when a
+    longer span is asked for. Bars stored without a reach are taken to
+    cover whatever is asked.
+    """
+    def __init__(self, path=DEFAULT_BARS_PATH, fresh_for=None):
+        self.path = path
+        self.fresh_for = dict(DEFAULT_FRESH_FOR)
+        if fresh_for:
+            self.fresh_for.update(fresh_for)
+        self._lock = threading.Lock()
+        if path != ":memory:" and dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.path,
+                                   timeout=10,
+                                   check_same_thread=False)
+        with self._db:
+            for statement in SCHEMA:
+                self._db.execute(statement)
+
+    def reopen(self):
+        """Open a connection of this process's own, e.g. after a fork.
+
+        An in-memory store cannot be shared, so it starts out empty.
+        """
+        self._lock = threading.Lock()
+        self._connect()
+
+    def state(self, symbol, interval):
+        """(last stored begins_at, last sync time), None where unknown."""
+        with self._lock:
+            last = self._db.execute(
+                "SELECT MAX(begins_at) FROM bars"
+                " WHERE symbol = ? AND interval = ?",
+                (symbol, interval)).fetchone()[0]
+            synced = self._db.execute(
+                "SELECT synced_at FROM syncs"
+                " WHERE symbol = ? AND interval = ?",
+                (symbol, interval)).fetchone()
+        return last, synced[0] if synced else None
+
+    def reach(self, symbol, interval):
+        """Widest span the stored bars are complete for, None if unknown."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT span FROM reaches WHERE symbol = ? AND interval = ?",
+                (symbol, interval)).fetchone()
+        return row[0] if row else None
+
+    def merge(self, symbol, interval, bars, synced_at=None, reach=None):
+        rows = [(symbol, interval, bar["begins_at"], bar["open_price"],
+                 bar["close_price"], bar["high_price"], bar["low_price"],
+                 bar.get("volume"), bar.get("session"),
+                 int(bool(bar.get("interpolated")))) for bar in bars if bar]
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO bars VALUES"
+                    " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if synced_at is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+                        (symbol, interval, synced_at))
+                if reach is not None:
+                    self._extend_reach(symbol, interval, reach)
+
+    def _extend_reach(self, symbol, interval, reach):
+        row = self._db.execute(
+            "SELECT span FROM reaches WHERE symbol = ? AND interval = ?",
+            (symbol, interval)).fetchone()
+        if row and SPAN_SECONDS[row[0]] >= SPAN_SECONDS[reach]:
+            return
+        self._db.execute("INSERT OR REPLACE INTO reaches VALUES (?, ?, ?)",
+                         (symbol, interval, reach))
+
+    def bars(self, symbol, interval, since=None):
+        """Stored bars, oldest first, shaped like get_historicals output."""
+        query = ("SELECT " + ", ".join(COLUMNS) + " FROM bars"
+                 " WHERE symbol = ? AND interval = ?")
+        params = [symbol, interval]
+        if since:
+            query += " AND begins_at >= ?"
+            params.append(since)
+        query += " ORDER BY begins_at"
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+        bars = []
+        for row in rows:
+            bar = dict(zip(COLUMNS, row))
+            bar["interpolated"] = bool(bar["interpolated"])
+            bar["symbol"] = symbol
+            bars.append(bar)
+        return bars
+
+    def closes(self, symbols, interval, span):
+        """{symbol: close prices, oldest first} covering span for symbols.
+
+        Each symbol's window counts back from its own newest bar stored at
+        interval. Symbols without stored bars are left out.
+        """
+        closes = {}
+        for i in range(0, len(symbols), QUERY_CHUNK):
+            chunk = list(symbols[i:i + QUERY_CHUNK])
+            marks = ", ".join("?" * len(chunk))
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT bars.symbol, close_price FROM bars JOIN"
+                    " (SELECT symbol, MAX(begins_at) AS last FROM bars"
+                    f" WHERE interval = ? AND symbol IN ({marks})"
+                    " GROUP BY symbol) AS newest"
+                    " ON bars.symbol = newest.symbol"
+                    " WHERE interval = ? AND begins_at >="
+                    " strftime(?, newest.last, ?)"
+                    " ORDER BY bars.symbol, begins_at",
+                    [interval] + chunk + [
+                        interval, STAMP_FORMAT,
+                        f"-{SPAN_SECONDS[span]} seconds"
+                    ]).fetchall()
+            for symbol, group in itertools.groupby(rows, lambda row: row[0]):
+                closes[symbol] = [row[1] for row in group]
+        return closes
+
+    def window(self, symbol, interval, span, last=None):
+        """Stored bars covering span, counting back from the newest."""
+        if last is None:
+            last, _ = self.state(symbol, interval)
+        if last is None:
+            return []
+        since = to_stamp(to_seconds(last) - SPAN_SECONDS[span])
+        return self.bars(symbol, interval, since)
+
+    def fetch_span(self, symbol, interval, span, now=None):
+        """Span to ask upstream for to bring symbol up to date, or None."""
+        now = time.time() if now is None else now
+        last, synced_at = self.state(symbol, interval)
+
+        if last is None:
+            return span
+        reach = self.reach(symbol, interval)
+        if reach is not None and SPAN_SECONDS[reach] < SPAN_SECONDS[span]:
+            return span
+        if synced_at is not None and now - synced_at < self.fresh_for.get(
+                interval, 0):
+            return None
+        return catch_up_span(interval, now - to_seconds(last), span)
+
+    def sync(self, symbol, interval, span, fetch, now=None):
+        """Bars for span, fetching from upstream only what is missing.
+
+        fetch(span) must return get_historicals data for symbol at this
+        interval. If it fails, whatever is stored is served instead, or
+        None when nothing is.
+        """
+        now = time.time() if now is None else now
+        fetch_span = self.fetch_span(symbol, interval, span, now)
+
+        if fetch_span:
+            try:
+                bars = fetch(fetch_span)
+            except Exception as e:
+                print(f"Could not sync {interval} bars for '{symbol}'.")
+                print(e)
+                bars = None
+            if bars and bars != [None]:
+                full = fetch_span == span
+                self.merge(symbol,
+                           interval,
+                           bars,
+                           synced_at=now,
+                           reach=span if full else None)
+
+        return self.window(symbol, interval, span) or None
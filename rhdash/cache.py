@@ -0,0 +1,259 @@
+"""Bounded, time-aware cache for upstream responses."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from os.path import dirname
+from os.path import join
+
+from rhdash.config import DATA_DIR
+
+MISSING = object()
+
+DEFAULT_SHARED_PATH = join(DATA_DIR, "cache.sqlite")
+
+DEFAULT_SIZE = 512
+DEFAULT_TTL = 60
+
+DEFAULT_TTLS = {
+    "name": 4 * 60 * 60,
+    "symbol_by_url": 24 * 60 * 60,
+    "instrument": 24 * 60 * 60,
+    "watchlist": 60,
+    "fundamentals": 5 * 60,
+    "quote": 5,
+    "day": 30,
+    "week": 5 * 60,
+    "year": 15 * 60
+}
+
+
+class SharedCache:
+    """Cache entries in a SQLite file, visible to every process using it.
+
+    Keys and values must be JSON serializable. Each process opens its own
+    connection on first use, including after a fork.
+    """
+    def __init__(self, path=DEFAULT_SHARED_PATH):
+        self.path = path
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._db = sqlite3.connect(self.path,
+                                       timeout=10,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            with self._db:
+                self._db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                                 " key TEXT PRIMARY KEY,"
+                                 " value TEXT NOT NULL,"
+                                 " expires_at REAL NOT NULL)")
+            self._pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        """(value, expires_at in epoch seconds), or (MISSING, None)."""
+        db = self._connection()
+        with self._lock:
+            row = db.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?",
+                (json.dumps(key), )).fetchone()
+        if row is None or row[1] <= time.time():
+            return MISSING, None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, value, ttl):
+        db = self._connection()
+        now = time.time()
+        with self._lock:
+            with db:
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                           (json.dumps(key), json.dumps(value), now + ttl))
+                db.execute("DELETE FROM entries WHERE expires_at <= ?",
+                           (now, ))
+
+    def invalidate(self, key):
+        db = self._connection()
+        with self._lock:
+            with db:
+                db.execute("DELETE FROM entries WHERE key = ?",
+                           (json.dumps(key), ))
+
+    def clear(self):
+        db = self._connection()
+        with self._lock:
+            with db:
+                db.execute("DELETE FROM entries")
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a per-endpoint freshness window.
+
+    Keys are tuples whose first element names the endpoint, which selects
+    the time to live. Once the cache holds `size` entries, the least
+    recently used one is evicted, whether it has expired or not.
+
+    With a SharedCache behind it, misses are looked up there and every put
+    is written through, so separate processes reuse each other's fetches.
+    """
+    def __init__(self, size=DEFAULT_SIZE, ttls=None, default_ttl=DEFAULT_TTL):
+        self.size = size
+        self.ttls = dict(DEFAULT_TTLS)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.shared = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if ttls:
+            self.ttls.update(ttls)
+
+    def configure(self, cache_config):
+        """Apply the "cache" section of the config file."""
+        with self._lock:
+            self.size = int(cache_config.get("size", self.size))
+            self.default_ttl = float(
+                cache_config.get("default_ttl", self.default_ttl))
+            if "ttl" in cache_config:
+                self.ttls.update(cache_config["ttl"])
+            self._trim()
+        if "shared" in cache_config:
+            shared = cache_config["shared"]
+            self.shared = SharedCache(
+                shared.get("path", DEFAULT_SHARED_PATH)) if shared.get(
+                    "enabled") else None
+
+    def ttl_for(self, endpoint):
+        return float(self.ttls.get(endpoint, self.default_ttl))
+
+    def get(self, key):
+        """Value for key, or MISSING if absent or no longer fresh."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is not MISSING:
+                expires_at, value = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            if self.shared is None:
+                self.misses += 1
+                return MISSING
+
+        value, expires_at = self.shared.get(key)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self._entries[key] = (now + expires_at - time.time(), value)
+            self._trim()
+            return value
+
+    def stale(self, key):
+        """Value last put for key, even if no longer fresh, or MISSING.
+
+        Expired entries are kept until they are evicted or replaced, so
+        they can stand in while a fresh value is being fetched.
+        """
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+        return entry if entry is MISSING else entry[1]
+
+    def put(self, key, value):
+        ttl = self.ttl_for(key[0])
+        if ttl <= 0 or self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            self._trim()
+        if self.shared is not None:
+            self.shared.put(key, value, ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.invalidate(key)
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose key satisfies predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.size
+            }
+
+    def _trim(self):
+        while len(self._entries) > max(self.size, 0):
+            self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """Lets concurrent calls for the same key share one call and its result.
+
+    The first caller for a key runs it. Callers arriving while it runs wait
+    for it and get the same value, or the same exception.
+    """
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """(func(), shared), where shared says another caller ran func."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                leading = True
+            else:
+                self.coalesced += 1
+                leading = False
+        if not leading:
+            return call.result(), True
+
+        try:
+            value = func()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(value)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return value, False
+
+    def pending(self, key):
+        """Future for the call running for key, or None if there is none."""
+        with self._lock:
+            return self._calls.get(key)
+
+    def stats(self):
+        with self._lock:
+            return {"coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -7,7 +7,8 @@ from os.path import isfile
 from os.path import join
 
 DEFAULT_CONFIG_TYPE = "json"
-DEFAULT_PATH = join(expanduser("~"), ".rhdash", "config")
+DATA_DIR = join(expanduser("~"), ".rhdash")
+DEFAULT_PATH = join(DATA_DIR, "config")
 
 TEMPLATE = {
     "dash": {
@@ -17,7 +18,11 @@ TEMPLATE = {
         }
     },
     "robinhood": {
-        "ema_days": []
+        "ema_days": [],
+        "cache": {
+            "size": 0,
+            "ttl": {}
+        }
     }
 }
 
@@ -26,10 +31,95 @@ DEFAULT = {
         "creds": {
             "user": "hello",
             "password": "world"
+        },
+        "fast_start": False,
+        "watchlist_refresh": 300,
+        "figure_cache": {
+            "size": 64,
+            "ttl": {
+                "figure": 3600
+            }
+        },
+        "payload": {
+            "enabled": False,
+            "max_points": 1000,
+            "decimals": 4,
+            "report": False
+        },
+        "live": {
+            "period": 30,
+            "max_points": 2000
+        },
+        "indicators": {
+            "day": [],
+            "week": [],
+            "year": []
         }
     },
     "robinhood": {
-        "ema_days": [10, 20, 50]
+        "ema_days": [10, 20, 50],
+        "cache": {
+            "size": 512,
+            "shared": {
+                "enabled": False,
+                "path": join(DATA_DIR, "cache.sqlite")
+            },
+            "ttl": {
+                "name": 14400,
+                "symbol_by_url": 86400,
+                "watchlist": 60,
+                "fundamentals": 300,
+                "quote": 5,
+                "day": 30,
+                "week": 300,
+                "year": 900
+            }
+        },
+        "pool": {
+            "workers": 8,
+            "connections": 16
+        },
+        "batch": {
+            "fundamentals": 100,
+            "quotes": 100,
+            "historicals": 75
+        },
+        "instrument_refresh": 604800,
+        "deadlines": {
+            "budget": 5.0,
+            "http": 30.0,
+            "timeout": {
+                "name": 3.0
+            }
+        },
+        "provider": {
+            "mode": "live",
+            "fixtures": join(DATA_DIR, "fixtures"),
+            "latency": 0.0
+        },
+        "bars": {
+            "enabled": True,
+            "path": join(DATA_DIR, "bars.sqlite"),
+            "fresh_for": {
+                "5minute": 30,
+                "10minute": 300,
+                "day": 900
+            }
+        },
+        "intervals": {
+            "day": "5minute",
+            "week": "10minute",
+            "year": "day"
+        },
+        "prefetch": {
+            "enabled": False,
+            "period": 300,
+            "rate": 5.0,
+            "concurrency": 2,
+            "hours": ["09:30", "16:00"],
+            "recent": 20,
+            "batch": 50
+        }
     }
 }
 
@@ -78,3 +168,31 @@ def fetch_config(args):
     else:
         print(f"Config '{path}' is not a file!")
     return config
+
+
+def apply_args(config, args):
+    """Let command line arguments override the config file."""
+    if not args:
+        return config
+
+    if "robinhood" not in config:
+        config["robinhood"] = {}
+    robinhood_config = config["robinhood"]
+
+    if getattr(args, "fast_start", None):
+        if "dash" not in config:
+            config["dash"] = {}
+        config["dash"]["fast_start"] = True
+
+    overrides = {
+        "mode": getattr(args, "provider", None),
+        "fixtures": getattr(args, "fixtures", None),
+        "latency": getattr(args, "latency", None)
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            if "provider" not in robinhood_config:
+                robinhood_config["provider"] = {}
+            robinhood_config["provider"][key] = value
+
+    return config
@@ -0,0 +1,102 @@
+"""Per-symbol data shared by the dashboard panels."""
+import hashlib
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from rhdash.cache import MISSING
+from rhdash.cache import TTLCache
+from rhdash.metrics import stage
+from rhdash.metrics import watch_cache
+from rhdash.parse import PRICE_COLS
+from rhdash.parse import parse_historicals
+from rhdash.rh import fetch_symbol_data
+
+SPAN_TIMEZONES = {"day": "US/Eastern", "week": "US/Eastern", "year": None}
+
+STORE = TTLCache(size=32, ttls={"symbol": 60 * 60})
+watch_cache("symbols", STORE)
+
+_versions = itertools.count(1)
+
+
+def frame_version(df):
+    """Short digest of a frame's bars; it changes whenever any bar does."""
+    if df is None:
+        return None
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(df["begins_at"].values.view("i8").tobytes())
+    digest.update(
+        np.ascontiguousarray(df[PRICE_COLS + ["volume"]].to_numpy(
+            dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def load_symbol(symbol):
+    """Fetch and parse everything the panels need for symbol.
+
+    The result is kept in STORE so every panel reads the same data without
+    going upstream again. Spans that fail to load are None. Fields that
+    were late are listed under "pending", or under "stale" when an older
+    value stands in for them, and under "late" while they are still being
+    fetched.
+    """
+    with stage("fetch"):
+        symbol_data = fetch_symbol_data(symbol)
+    with stage("parse"):
+        frames = parse_symbol(symbol, symbol_data)
+
+    if symbol:
+        STORE.put(("symbol", symbol), frames)
+    return frames
+
+
+def parse_symbol(symbol, symbol_data):
+    """Frames for the panels from fetch_symbol_data output."""
+    frames = {
+        "symbol": symbol,
+        "version": next(_versions),
+        "name": symbol_data["name"] or "",
+        "fundamentals": None,
+        "stale": list(symbol_data.get("stale", [])),
+        "pending": list(symbol_data.get("pending", [])),
+        "late": list(symbol_data.get("late", []))
+    }
+
+    try:
+        if symbol_data["fundamentals"]:
+            frames["fundamentals"] = pd.DataFrame(
+                symbol_data["fundamentals"]).iloc[0]
+    except Exception as e:
+        print(f"Could not parse fundamentals for '{symbol}'.")
+        print(e)
+
+    for span, tz in SPAN_TIMEZONES.items():
+        frames[span] = None
+        try:
+            if symbol_data[span]:
+                frames[span] = parse_historicals(symbol_data[span], tz,
+                                                 span)
+        except Exception as e:
+            print(f"Could not parse {span} data for '{symbol}'.")
+            print(e)
+
+    frames["versions"] = {
+        span: frame_version(frames[span])
+        for span in SPAN_TIMEZONES
+    }
+    return frames
+
+
+def symbol_frames(symbol):
+    """Stored data for symbol, loading it if it is not held yet."""
+    frames = STORE.get(("symbol", symbol))
+    if frames is MISSING:
+        frames = load_symbol(symbol)
+    return frames
+
+
+def heading_for(frames):
+    name = frames["name"]
+    return f"{name} ({frames['symbol']})" if len(name) > 0 else ""
@@ -0,0 +1,262 @@
+"""On-disk index of instrument URLs, symbols and names."""
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from os.path import dirname
+from os.path import join
+
+from rhdash.config import DATA_DIR
+from rhdash.rh import answer_locally
+from rhdash.rh import at_fork
+from rhdash.rh import executor
+from rhdash.rh import get_all_instruments
+from rhdash.rh import get_instrument_by_url
+
+DEFAULT_INDEX_PATH = join(DATA_DIR, "instruments.sqlite")
+
+# Seconds before the full list of instruments is fetched again
+DEFAULT_REFRESH = 7 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instruments (
+    url TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    tradeable INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(config):
+    robinhood_config = config["robinhood"] if "robinhood" in config else {}
+    if "instrument_index" in robinhood_config:
+        return robinhood_config["instrument_index"]
+    return DEFAULT_INDEX_PATH
+
+
+def instrument_index(path=DEFAULT_INDEX_PATH):
+    """Shared InstrumentIndex for path, opened on first use."""
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = InstrumentIndex(path)
+        return _indexes[path]
+
+
+def reopen_indexes():
+    global _indexes_lock
+    _indexes_lock = threading.Lock()
+    for index in _indexes.values():
+        index.reopen()
+
+
+at_fork(reopen_indexes)
+
+
+def load_instruments(config):
+    """Answer names from the index and keep it holding every instrument.
+
+    The full list is fetched in the background when it is missing or more
+    than robinhood.instrument_refresh seconds old.
+    """
+    robinhood_config = config["robinhood"] if "robinhood" in config else {}
+    refresh = robinhood_config.get("instrument_refresh", DEFAULT_REFRESH)
+    index = instrument_index(index_path(config))
+    answer_locally("name", index.name_of)
+
+    synced_at = index.synced_at()
+    if synced_at is None or time.time() - synced_at > float(refresh):
+        threading.Thread(target=sync_instruments,
+                         args=(index, ),
+                         name="rhdash-instruments",
+                         daemon=True).start()
+    return index
+
+
+def sync_instruments(index):
+    instruments = get_all_instruments()
+    if instruments:
+        index.sync(instruments)
+        print(f"Indexed {len(instruments):,} instruments.")
+
+
+class InstrumentIndex:
+    """Maps instrument URLs to symbols, persisted in SQLite.
+
+    The whole table is loaded into memory once, so lookups never touch the
+    disk or the network. Only URLs that have never been seen are resolved
+    upstream.
+
+    Once sync() has stored every instrument upstream lists, the index is
+    full: symbols it does not know do not exist. Symbols and lowercased
+    names are also kept sorted, for prefix completion by bisection.
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:" and dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._connect()
+        self._load()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.path,
+                                   timeout=10,
+                                   check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def _load(self):
+        self._by_url = {}
+        self._by_symbol = {}
+        self._sorted = None
+        self._synced_at = None
+        self._store(self._db.execute(
+            "SELECT url, symbol, name, tradeable FROM instruments"))
+        self._synced_at = self._read_synced_at()
+
+    def _read_synced_at(self):
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = 'synced_at'").fetchone()
+        return row[0] if row else None
+
+    def _store(self, rows):
+        for url, symbol, name, tradeable in rows:
+            self._by_url[url] = (symbol, name, tradeable)
+            known = self._by_symbol.get(symbol)
+            if known is None or tradeable or not known[1]:
+                self._by_symbol[symbol] = (name, tradeable)
+        self._sorted = None
+
+    def reopen(self):
+        """Open a connection of this process's own, e.g. after a fork."""
+        self._lock = threading.Lock()
+        self._connect()
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def symbol_for(self, url):
+        entry = self._by_url.get(url)
+        return entry[0] if entry else None
+
+    def name_for(self, url):
+        entry = self._by_url.get(url)
+        return entry[1] if entry else None
+
+    def name_of(self, symbol):
+        entry = self._by_symbol.get(symbol)
+        return entry[0] if entry else None
+
+    def synced_at(self):
+        """When every instrument was last stored, in epoch seconds."""
+        with self._lock:
+            return self._read_synced_at()
+
+    def is_full(self):
+        """True once every instrument is indexed, here or by another process.
+
+        Until then this checks the disk, so a sync finished elsewhere is
+        picked up.
+        """
+        if self._synced_at is None and self.synced_at() is not None:
+            with self._lock:
+                self._load()
+        return self._synced_at is not None
+
+    def knows(self, symbol):
+        return symbol in self._by_symbol
+
+    def complete(self, prefix, limit=10):
+        """Up to limit (symbol, name, tradeable) matching prefix.
+
+        Symbols starting with prefix come first, then symbols whose name
+        does.
+        """
+        prefix = str(prefix).strip()
+        if not prefix:
+            return []
+        self.is_full()
+        symbols, names = self._prefix_lists()
+
+        found = []
+        key = prefix.upper()
+        i = bisect_left(symbols, key)
+        while i < len(symbols) and symbols[i].startswith(key):
+            found.append(symbols[i])
+            if len(found) >= limit:
+                break
+            i += 1
+
+        key = prefix.lower()
+        i = bisect_left(names, (key, ))
+        while (len(found) < limit and i < len(names)
+               and names[i][0].startswith(key)):
+            if names[i][1] not in found:
+                found.append(names[i][1])
+            i += 1
+
+        return [(symbol, ) + self._by_symbol[symbol] for symbol in found]
+
+    def _prefix_lists(self):
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = (sorted(self._by_symbol),
+                                sorted((name.lower(), symbol)
+                                       for symbol, (name, _) in
+                                       self._by_symbol.items() if name))
+            return self._sorted
+
+    def resolve(self, urls):
+        """Symbols for urls, resolving unknown ones in one concurrent batch.
+
+        Returns {url: symbol}; URLs that cannot be resolved are left out.
+        """
+        unknown = [url for url in set(urls) if url not in self._by_url]
+        if unknown:
+            self.add(
+                zip(unknown, executor().map(get_instrument_by_url, unknown)))
+
+        return {
+            url: self._by_url[url][0]
+            for url in urls if url in self._by_url
+        }
+
+    def add(self, instruments):
+        """Store (url, instrument) pairs as returned by the instruments API."""
+        rows = []
+        for url, instrument in instruments:
+            if instrument and instrument.get("symbol"):
+                name = instrument.get("simple_name") or instrument.get("name")
+                tradeable = instrument.get("tradeable")
+                rows.append((url, instrument["symbol"], name,
+                             None if tradeable is None else int(tradeable)))
+
+        if not rows:
+            return
+
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO instruments VALUES (?, ?, ?, ?)",
+                    rows)
+            self._store(rows)
+
+    def sync(self, instruments):
+        """Store every instrument upstream lists, making the index full."""
+        self.add((instrument["url"], instrument)
+                 for instrument in instruments if instrument.get("url"))
+        synced_at = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)",
+                    (synced_at, ))
+            self._synced_at = synced_at
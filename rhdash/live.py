@@ -0,0 +1,147 @@
+"""Live updates of the day graph through dcc.Graph extendData."""
+import uuid
+
+from rhdash.data import SPAN_TIMEZONES
+from rhdash.panels import INDICATOR_SPECS
+from rhdash.panels import compact_prices
+from rhdash.panels import compact_times
+from rhdash.panels import indicator_values
+from rhdash.parse import parse_historicals
+from rhdash.rh import get_day_data
+
+# Most bars kept on each trace of the day graph; set from dash.live
+LIVE = {"max_points": 2000}
+
+# Every key an update may carry. Plotly.extendTraces wants each of them on
+# every trace it extends, so live figures get empty ones where missing.
+TRACE_KEYS = ["x", "y", "open", "high", "low", "close"]
+
+BAR_FIELDS = ["open_price", "high_price", "low_price", "close_price"]
+
+# Trace indices of a day figure built with the forming bar on its own;
+# indicator traces follow
+LIVE_TRACES = [0, 1, 2, 3]
+
+
+def configure_live(dash_config):
+    if "live" in dash_config:
+        LIVE.update(dash_config["live"])
+
+
+def bar_values(bar):
+    return [float(bar[field]) for field in BAR_FIELDS]
+
+
+def extendable(figure):
+    """A copy of a day figure with every key of TRACE_KEYS on each trace.
+
+    Built figures are shared through the figure cache, so they are never
+    changed in place.
+    """
+    if not isinstance(figure, dict):
+        return figure
+    data = []
+    for trace in figure["data"]:
+        data.append(dict({key: [] for key in TRACE_KEYS}, **trace))
+    return dict(figure, data=data)
+
+
+def live_base(frames, figure):
+    """Where live updates of a freshly drawn day figure start from.
+
+    None when there is nothing to update. Otherwise the last bar the
+    figure shows is returned, with an id telling this figure apart from
+    any drawn before.
+    """
+    df = frames["day"]
+    if df is None or not len(df) or not isinstance(figure, dict):
+        return None
+
+    last = df.iloc[-1]
+    return {
+        "id": uuid.uuid4().hex,
+        "symbol": frames["symbol"],
+        "indicators": {
+            trace.get("name"): i
+            for i, trace in enumerate(figure["data"])
+            if i >= len(LIVE_TRACES)
+        },
+        "last": last["begins_at"].tz_convert("UTC").strftime(
+            "%Y-%m-%dT%H:%M:%SZ"),
+        "bar": [float(last[field]) for field in BAR_FIELDS]
+    }
+
+
+def live_update(base, state):
+    """(extendData, state) bringing the day graph from state up to date.
+
+    Only bars from the last one shown onwards are parsed and sent. Bars
+    completed since are appended to traces 0 and 1 and the forming bar in
+    traces 2 and 3 is replaced, so each update is as small as the number
+    of new bars. Indicator traces, which end at the last completed bar,
+    are extended by the indicator engine from its state. extendData is
+    None when nothing changed.
+    """
+    if not base:
+        return None, state
+    if not state or state["base"] != base["id"]:
+        state = {"base": base["id"], "last": base["last"], "bar": base["bar"]}
+
+    data = get_day_data(base["symbol"]) or []
+    start = next((i for i, bar in enumerate(data)
+                  if bar["begins_at"] >= state["last"]), None)
+    if start is None:
+        return None, state
+    forming = len(data) - 1
+    if (start == forming and data[start]["begins_at"] == state["last"]
+            and bar_values(data[start]) == state["bar"]):
+        return None, state
+
+    first = max(min(start, forming) - 1, 0)
+    df = parse_historicals(data[first:], SPAN_TIMEZONES["day"])
+    times = list(compact_times(df["begins_at"]))
+    prices = {
+        field: compact_prices(df[field]).tolist()
+        for field in BAR_FIELDS
+    }
+    done = slice(start - first, forming - first)
+    joined = slice(max(forming - first - 1, 0), forming - first + 1)
+    last = slice(forming - first, forming - first + 1)
+
+    def traces(field):
+        values = prices[field]
+        return [[], values[done], [], values[last]]
+
+    closes = prices["close_price"]
+    update = {
+        "x": [times[done], times[done], times[joined], times[last]],
+        "y": [closes[done], [], closes[joined], []],
+        "open": traces("open_price"),
+        "high": traces("high_price"),
+        "low": traces("low_price"),
+        "close": traces("close_price")
+    }
+    max_points = int(LIVE["max_points"])
+    limits = [max_points, max_points, joined.stop - joined.start, 1]
+    indices = list(LIVE_TRACES)
+
+    if done.stop > done.start and start > 0:
+        # The engine last saw the bar before the first one completed since
+        completed = df.iloc[done.start - 1:done.stop]
+        for spec in INDICATOR_SPECS.get("day") or []:
+            values = indicator_values(base["symbol"], "day", spec,
+                                      completed, batch=False)
+            for name, series in (values or {}).items():
+                if name not in base.get("indicators", {}):
+                    continue
+                indices.append(base["indicators"][name])
+                limits.append(max_points)
+                update["x"].append(times[done])
+                update["y"].append(compact_prices(series[1:]).tolist())
+                for key in TRACE_KEYS[2:]:
+                    update[key].append([])
+
+    state = dict(state,
+                 last=data[forming]["begins_at"],
+                 bar=bar_values(data[forming]))
+    return [update, indices, {key: limits for key in update}], state
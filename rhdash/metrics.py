@@ -0,0 +1,257 @@
+"""Timings and counts for the dashboard, in Prometheus text format."""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response
+from flask import request
+
+from rhdash.startup import TIMINGS
+
+METRICS_PATH = "/metrics"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = [.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30]
+
+BYTES_BUCKETS = [1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7]
+
+# Every metric and collector, as functions yielding exposition lines
+_collectors = []
+
+# The callback running on this thread, for stage timings and payload sizes
+_local = threading.local()
+
+# TTLCaches reported by name
+_caches = {}
+
+
+def labels_text(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def collect(collector):
+    """Add collector(), yielding exposition lines, to every scrape."""
+    _collectors.append(collector)
+    return collector
+
+
+class Counter:
+    """Count per combination of label values."""
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        collect(self.lines)
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{labels_text(self.labels, labels)} {value}"
+
+
+class Histogram:
+    """Observations per combination of label values, in buckets."""
+    def __init__(self, name, description, labels=(), buckets=None):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = sorted(buckets or SECONDS_BUCKETS)
+        self._values = {}
+        self._lock = threading.Lock()
+        collect(self.lines)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            if labels not in self._values:
+                self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            entry = self._values[labels]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[1] if entry else 0
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = sorted((labels, (list(counts), n, total))
+                            for labels, (counts, n, total) in
+                            self._values.items())
+        names = self.labels + ("le", )
+        for labels, (counts, n, total) in values:
+            for count, bound in zip(counts, self.buckets):
+                le = labels_text(names, labels + (f"{bound:g}", ))
+                yield f"{self.name}_bucket{le} {count}"
+            le = labels_text(names, labels + ("+Inf", ))
+            yield f"{self.name}_bucket{le} {n}"
+            yield f"{self.name}_sum{labels_text(self.labels, labels)} {total}"
+            yield f"{self.name}_count{labels_text(self.labels, labels)} {n}"
+
+
+UPSTREAM_SECONDS = Histogram("rhdash_upstream_seconds",
+                             "Latency of upstream calls.", ["endpoint"])
+
+UPSTREAM_ERRORS = Counter("rhdash_upstream_errors_total",
+                          "Upstream calls that raised or returned nothing.",
+                          ["endpoint"])
+
+UPSTREAM_COALESCED = Counter(
+    "rhdash_upstream_coalesced_total",
+    "Calls that shared another caller's in-flight upstream fetch.",
+    ["endpoint"])
+
+CALLBACK_SECONDS = Histogram("rhdash_callback_seconds",
+                             "Wall time of Dash callbacks.", ["callback"])
+
+STAGE_SECONDS = Histogram("rhdash_callback_stage_seconds",
+                          "Wall time of each stage within a callback.",
+                          ["callback", "stage"])
+
+PAYLOAD_BYTES = Histogram("rhdash_response_bytes",
+                          "Size of Dash callback responses.", ["callback"],
+                          BYTES_BUCKETS)
+
+
+class InstrumentedProvider:
+    """Times every call to another provider and counts its failures.
+
+    Historicals are labeled with their span, so day, week and year bars
+    show up as separate endpoints.
+    """
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __getattr__(self, method):
+        call = getattr(self.inner, method)
+        if method in ("login", "session") or method.startswith("_"):
+            return call
+
+        @wraps(call)
+        def timed(*args):
+            endpoint = args[1] if method == "historicals" else method
+            start = time.perf_counter()
+            try:
+                result = call(*args)
+            except Exception:
+                UPSTREAM_ERRORS.inc(endpoint)
+                raise
+            finally:
+                UPSTREAM_SECONDS.observe(time.perf_counter() - start,
+                                         endpoint)
+            if result is None or result == [None]:
+                UPSTREAM_ERRORS.inc(endpoint)
+            return result
+
+        return timed
+
+
+def timed_callback(func):
+    """Time a Dash callback and let stage() attribute time to it."""
+    @wraps(func)
+    def wrapper(*args):
+        _local.callback = func.__name__
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - start,
+                                     func.__name__)
+            _local.callback = None
+            _local.responding = func.__name__
+
+    return wrapper
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage name of the current callback."""
+    callback = getattr(_local, "callback", None) or "none"
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, callback, name)
+
+
+def watch_cache(name, cache):
+    """Report hits, misses and size of a TTLCache on every scrape."""
+    _caches[name] = cache
+
+
+@collect
+def cache_lines():
+    stats = {name: cache.stats() for name, cache in sorted(_caches.items())}
+    families = [
+        ("rhdash_cache_hits_total", "counter", "Cache lookups served.",
+         lambda s: s["hits"]),
+        ("rhdash_cache_misses_total", "counter", "Cache lookups missed.",
+         lambda s: s["misses"]),
+        ("rhdash_cache_hit_ratio", "gauge", "Share of lookups served.",
+         lambda s: s["hits"] / max(s["hits"] + s["misses"], 1)),
+        ("rhdash_cache_entries", "gauge", "Entries held.",
+         lambda s: s["size"]),
+    ]
+    for family, kind, description, value in families:
+        yield f"# HELP {family} {description}"
+        yield f"# TYPE {family} {kind}"
+        for name, cache_stats in stats.items():
+            labels = labels_text(["cache"], [name])
+            yield f"{family}{labels} {value(cache_stats)}"
+
+
+@collect
+def startup_lines():
+    yield "# HELP rhdash_startup_seconds Seconds from start to each milestone."
+    yield "# TYPE rhdash_startup_seconds gauge"
+    for milestone, seconds in sorted(TIMINGS.items()):
+        labels = labels_text(["milestone"], [milestone])
+        yield f"rhdash_startup_seconds{labels} {seconds}"
+
+
+def render():
+    lines = []
+    for collector in list(_collectors):
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def add_metrics(server):
+    """Serve METRICS_PATH and record the size of each callback response."""
+    def metrics():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    server.add_url_rule(METRICS_PATH, "rhdash-metrics", metrics)
+
+    @server.after_request
+    def response_size(response):
+        callback = getattr(_local, "responding", None)
+        if callback and request.path.endswith("_dash-update-component"):
+            _local.responding = None
+            if not response.direct_passthrough:
+                PAYLOAD_BYTES.observe(len(response.get_data()), callback)
+        return response
@@ -0,0 +1,399 @@
+"""Builders for each dashboard panel."""
+import json
+
+import dash_html_components as html
+import dash_table
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from rhdash.alg import INDICATORS
+from rhdash.alg import IndicatorEngine
+from rhdash.alg import ema_series
+from rhdash.alg import lttb
+from rhdash.alg import make_indicator
+from rhdash.cache import MISSING
+from rhdash.cache import TTLCache
+from rhdash.data import heading_for
+from rhdash.metrics import collect
+from rhdash.metrics import stage
+from rhdash.metrics import watch_cache
+from rhdash.rh import VIEW_INTERVALS
+
+ROWS = 2
+GRAPH_HEIGHT = 420
+OSCILLATOR_HEIGHT = 210
+GRAPH_FONT_SIZE = 10
+CLOSE_COLOR = "#636efa"
+
+FIGURES = TTLCache(size=64, ttls={"figure": 60 * 60})
+watch_cache("figures", FIGURES)
+
+# Payload budget: off unless dash.payload.enabled is set
+PAYLOAD = {
+    "enabled": False,
+    "max_points": 1000,
+    "decimals": 4,
+    "report": False
+}
+
+# Indicators drawn on each span's graph, set from dash.indicators as lists
+# like [{"name": "sma", "period": 50}, {"name": "rsi"}]
+INDICATOR_SPECS = {"day": [], "week": [], "year": []}
+
+ENGINE = IndicatorEngine()
+
+# Serialized size in bytes of the last figure built for each span
+FIGURE_BYTES = {}
+
+
+def configure_figures(dash_config):
+    """Size and lifetime of the built-figure cache."""
+    if "figure_cache" in dash_config:
+        FIGURES.configure(dash_config["figure_cache"])
+    if "payload" in dash_config:
+        PAYLOAD.update(dash_config["payload"])
+    if "indicators" in dash_config:
+        INDICATOR_SPECS.update(dash_config["indicators"])
+
+
+def memoized_figure(frames, span, options, build):
+    """Serialized figure for span of frames, built at most once.
+
+    Entries are keyed by symbol, span, the overlay options and the version
+    of the span's bars. Once the bars change, older versions are dropped.
+    The figure is kept as parsed JSON, which is also much cheaper for Dash
+    to serialize again than a plotly Figure, together with its size, which
+    is recorded each time it is served.
+    """
+    symbol = frames["symbol"]
+    version = frames["versions"][span]
+    if not symbol or version is None:
+        return build()
+
+    key = ("figure", symbol, span, version, frames["name"],
+           span in frames.get("stale", ())) + tuple(options)
+    entry = FIGURES.get(key)
+    if entry is MISSING:
+        FIGURES.invalidate_where(lambda cached: cached[1:3] == (
+            symbol, span) and cached[3] != version)
+        with stage("figure"):
+            fig = build()
+        with stage("serialize"):
+            serialized = fig.to_json()
+            entry = (json.loads(serialized), len(serialized))
+        FIGURES.put(key, entry)
+    figure, size = entry
+    record_payload(symbol, span, size)
+    return figure
+
+
+def record_payload(symbol, span, size):
+    FIGURE_BYTES[span] = size
+    if PAYLOAD["report"]:
+        print(f"{symbol} {span} figure: {size:,} bytes")
+
+
+@collect
+def payload_lines():
+    yield "# HELP rhdash_figure_bytes Size of the last figure for each span."
+    yield "# TYPE rhdash_figure_bytes gauge"
+    for span, size in sorted(FIGURE_BYTES.items()):
+        yield f'rhdash_figure_bytes{{span="{span}"}} {size}'
+
+
+def compact_times(times):
+    """Timestamps as short strings when the payload budget is on.
+
+    Daily bars keep only the date; intraday bars drop seconds and offset.
+    """
+    if not PAYLOAD["enabled"]:
+        return times
+    if ((times.dt.hour == 0) & (times.dt.minute == 0)).all():
+        return times.dt.strftime("%Y-%m-%d").to_numpy()
+    return times.dt.strftime("%Y-%m-%d %H:%M").to_numpy()
+
+
+def compact_prices(prices):
+    prices = np.asarray(prices, dtype=float)
+    if PAYLOAD["enabled"] and PAYLOAD["decimals"] is not None:
+        return prices.round(int(PAYLOAD["decimals"]))
+    return prices
+
+
+def line_points(x, y):
+    """x and y for a line trace, downsampled with LTTB above the budget."""
+    y = compact_prices(y)
+    max_points = int(PAYLOAD["max_points"] or 0)
+    if PAYLOAD["enabled"] and 0 < max_points < len(y):
+        keep = lttb(y, max_points)
+        return np.asarray(x)[keep], y[keep]
+    return x, y
+
+
+def empty_figure(rows=ROWS):
+    """Price rows, then `rows - ROWS` shorter oscillator rows."""
+    return make_subplots(rows=rows,
+                         cols=1,
+                         shared_xaxes=True,
+                         vertical_spacing=0.01,
+                         row_heights=[GRAPH_HEIGHT] * ROWS +
+                         [OSCILLATOR_HEIGHT] * (rows - ROWS),
+                         row_titles=[""] * rows)
+
+
+def missing_figure(frames, span):
+    """Empty figure for span, saying so while its data is still coming."""
+    fig = empty_figure()
+    if span in frames.get("pending", ()):
+        fig.update_layout(title=f"{span_title(frames, span)} (loading)")
+    return fig
+
+
+def span_title(frames, span):
+    title = f"{heading_for(frames)} - {span.capitalize()}"
+    if span in frames.get("stale", ()):
+        title += " (stale, refreshing)"
+    return title
+
+
+def heading_panel(frames):
+    """Heading, description and fundamentals table for a symbol."""
+    heading = heading_for(frames)
+    values = frames["fundamentals"]
+    if values is None:
+        return heading, "", html.Table()
+
+    fundamentals = {}
+    fundamentals["OPEN"] = f"{float(values['open']):,.4f}"
+    fundamentals["HIGH"] = f"{float(values['high']):,.4f}"
+    fundamentals["LOW"] = f"{float(values['low']):,.4f}"
+    fundamentals["MARKET CAP"] = f"${float(values['market_cap']):,.0f}"
+    fundamentals["AVG VOL"] = f"{float(values['average_volume']):,.0f}"
+    fundamentals["CURR VOL"] = f"{float(values['volume']):,.0f}"
+
+    description = [
+        html.Br(),
+        html.P(f"{values['description']}"),
+        html.Br(),
+        html.Br()
+    ]
+
+    fundamentals_headers = html.Tr([html.Th(field) for field in fundamentals])
+    fundamentals_row = html.Tr(
+        [html.Td(fundamentals[field]) for field in fundamentals])
+    fundamentals_table = html.Table([fundamentals_headers] +
+                                    [fundamentals_row],
+                                    style={
+                                        "marginLeft": "auto",
+                                        "marginRight": "auto"
+                                    })
+
+    return heading, description, fundamentals_table
+
+
+def screener_table(table, ema_days):
+    """Sortable table of screen() results."""
+    columns = [{"name": "Symbol", "id": "symbol"}]
+    if "close" in table:
+        columns.append({"name": "Close", "id": "close", "type": "numeric"})
+        for n_days in ema_days:
+            columns.append({
+                "name": f"EMA {n_days}",
+                "id": f"ema_{n_days}",
+                "type": "numeric"
+            })
+            columns.append({
+                "name": f"% vs EMA {n_days}",
+                "id": f"diff_{n_days}",
+                "type": "numeric"
+            })
+
+    rows = table.round(2)
+    rows = rows.astype(object).where(rows.notna(), None)
+    return dash_table.DataTable(id="screener-table",
+                                columns=columns,
+                                data=rows.to_dict("records"),
+                                sort_action="native",
+                                page_size=50,
+                                style_table={"overflowX": "auto"},
+                                style_cell={
+                                    "fontFamily": "Courier New, monospace",
+                                    "fontSize": GRAPH_FONT_SIZE
+                                })
+
+
+def price_figure(df, symbol, forming=False, rows=ROWS):
+    """Close price above candlesticks, sharing the x axis.
+
+    With forming set, the last bar gets two traces of its own (2 and 3),
+    so live updates can replace it without resending the others.
+    """
+    fig = empty_figure(rows)
+    bars = df.iloc[:-1] if forming else df
+    times = compact_times(bars["begins_at"])
+    close_x, close_y = line_points(times, bars["close_price"])
+    close_price = go.Scatter({
+        "x": close_x,
+        "y": close_y,
+        "name": "close_price",
+        "line": {
+            "color": CLOSE_COLOR
+        }
+    })
+    candlestick = go.Candlestick({
+        "x": times,
+        "open": compact_prices(bars["open_price"]),
+        "high": compact_prices(bars["high_price"]),
+        "low": compact_prices(bars["low_price"]),
+        "close": compact_prices(bars["close_price"]),
+        "name": symbol
+    })
+    fig.append_trace(close_price, 1, 1)
+    fig.append_trace(candlestick, 2, 1)
+    if forming:
+        add_forming_bar(fig, df, symbol)
+    return fig
+
+
+def add_forming_bar(fig, df, symbol):
+    """The last bar, with the line from the bar before joining it."""
+    joined = df.iloc[-2:]
+    last = df.iloc[-1:]
+    fig.append_trace(
+        go.Scatter({
+            "x": compact_times(joined["begins_at"]),
+            "y": compact_prices(joined["close_price"]),
+            "name": "close_price",
+            "line": {
+                "color": CLOSE_COLOR
+            },
+            "hoverinfo": "skip"
+        }), 1, 1)
+    fig.append_trace(
+        go.Candlestick({
+            "x": compact_times(last["begins_at"]),
+            "open": compact_prices(last["open_price"]),
+            "high": compact_prices(last["high_price"]),
+            "low": compact_prices(last["low_price"]),
+            "close": compact_prices(last["close_price"]),
+            "name": symbol
+        }), 2, 1)
+
+
+def indicator_rows(span):
+    """Rows a span's figure needs: the price rows and one per oscillator."""
+    return ROWS + sum(not INDICATORS[spec["name"]].overlay
+                      for spec in INDICATOR_SPECS.get(span) or [])
+
+
+def indicator_bars(df):
+    """Bar columns as IndicatorEngine takes them; sessions are local dates."""
+    times = df["begins_at"]
+    return {
+        "time": times.values,
+        "close": df["close_price"].to_numpy(),
+        "high": df["high_price"].to_numpy(),
+        "low": df["low_price"].to_numpy(),
+        "volume": df["volume"].to_numpy(dtype=float),
+        "session": times.dt.tz_localize(None).values.astype("datetime64[D]")
+    }
+
+
+def indicator_values(symbol, span, spec, df, batch=True):
+    """ENGINE.compute for spec over the bars of df, keyed by symbol."""
+    key = (symbol, VIEW_INTERVALS[span], make_indicator(spec).label)
+    with stage("indicators"):
+        return ENGINE.compute(key, spec, indicator_bars(df), batch)
+
+
+def add_indicators(fig, frames, span, df):
+    """Draw span's configured indicators for the bars of df.
+
+    Overlays share the close price row; every other indicator gets a row
+    of its own below the candlesticks.
+    """
+    row = ROWS
+    times = compact_times(df["begins_at"])
+    for spec in INDICATOR_SPECS.get(span) or []:
+        overlay = INDICATORS[spec["name"]].overlay
+        if not overlay:
+            row += 1
+        values = indicator_values(frames["symbol"], span, spec, df)
+        for name, series in values.items():
+            x, y = line_points(times, series)
+            fig.append_trace(go.Scatter(x=x, y=y, name=name),
+                             1 if overlay else row, 1)
+
+
+def style_figure(fig, title, rows=ROWS, **layout):
+    fig.update_yaxes(zeroline=True, zerolinewidth=1, zerolinecolor="Grey")
+    fig.update_layout(title=title,
+                      hovermode="x unified",
+                      showlegend=False,
+                      height=(GRAPH_HEIGHT * ROWS + OSCILLATOR_HEIGHT *
+                              (rows - ROWS)),
+                      font=dict(family="Courier New, monospace",
+                                size=GRAPH_FONT_SIZE,
+                                color="#7f7f7f"),
+                      **layout)
+
+
+def day_figure(frames):
+    df = frames["day"]
+    if df is None or not len(df):
+        return missing_figure(frames, "day")
+
+    rows = indicator_rows("day")
+    fig = price_figure(df, frames["symbol"], forming=True, rows=rows)
+    add_indicators(fig, frames, "day", df.iloc[:-1])
+
+    fig.update_xaxes()
+    style_figure(fig,
+                 span_title(frames, "day"),
+                 rows,
+                 xaxis=dict(type="category"))
+    return fig
+
+
+def week_figure(frames):
+    df = frames["week"]
+    if df is None:
+        return missing_figure(frames, "week")
+
+    rows = indicator_rows("week")
+    fig = price_figure(df, frames["symbol"], rows=rows)
+    add_indicators(fig, frames, "week", df)
+
+    fig.update_xaxes(rangebreaks=[
+        dict(bounds=["sat", "mon"]),
+        dict(pattern="hour", bounds=[16, 9.5])
+    ])
+    style_figure(fig,
+                 span_title(frames, "week"),
+                 rows,
+                 xaxis=dict(type="category"))
+    return fig
+
+
+def year_figure(frames, ema_toggle, ema_days):
+    df = frames["year"]
+    if df is None:
+        return missing_figure(frames, "year")
+
+    rows = indicator_rows("year")
+    fig = price_figure(df, frames["symbol"], rows=rows)
+    add_indicators(fig, frames, "year", df)
+
+    if ema_toggle:
+        with stage("indicators"):
+            emas = ema_series(ema_days, df["close_price"].to_numpy())
+        times = compact_times(df["begins_at"])
+        for n_days in ema_days:
+            ema_x, ema_y = line_points(times, emas[n_days])
+            ema_trace = go.Scatter(x=ema_x, y=ema_y, name=f"ema_{n_days}")
+
+            fig.append_trace(ema_trace, 1, 1)
+
+    fig.update_xaxes(rangebreaks=[dict(bounds=["sat", "mon"])])
+    style_figure(fig, span_title(frames, "year"), rows)
+    return fig
@@ -0,0 +1,216 @@
+"""Background warming of the response cache for the watchlist."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+
+import pandas as pd
+
+from rhdash.config import DATA_DIR
+from rhdash.rh import BATCH_FETCHES
+from rhdash.rh import SYMBOL_FETCHES
+
+MARKET_TZ = "US/Eastern"
+
+LEADER_LOCK = join(DATA_DIR, "prefetch.lock")
+
+PREFETCHER = None
+
+# Held open for as long as this process leads the prefetch
+_leader = None
+
+DEFAULTS = {
+    "enabled": False,
+    "period": 300,
+    "rate": 5.0,
+    "concurrency": 2,
+    "hours": ["09:30", "16:00"],
+    "recent": 20,
+    "batch": 50
+}
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second on average.
+
+    A rate of zero or less means no limit.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Prefetcher:
+    """Periodically fetches every watchlist symbol into the cache.
+
+    Recently viewed symbols go first. Whatever can be fetched for many
+    symbols at once is, `batch` symbols per request. Each pass is held to a
+    request-rate ceiling and a concurrency limit. After the first pass,
+    passes only run during market hours.
+    """
+    def __init__(self, config, fetches=None, batches=None):
+        self.config = config
+        settings = dict(DEFAULTS)
+        if "prefetch" in config["robinhood"]:
+            settings.update(config["robinhood"]["prefetch"])
+
+        self.period = float(settings["period"])
+        self.concurrency = int(settings["concurrency"])
+        self.hours = settings["hours"]
+        self.recent_size = int(settings["recent"])
+        self.batch = max(int(settings["batch"]), 1)
+        self.limiter = RateLimiter(settings["rate"])
+        if fetches is None and batches is None:
+            fetches = [
+                fetch for field, fetch in SYMBOL_FETCHES.items()
+                if field not in BATCH_FETCHES
+            ]
+            batches = list(BATCH_FETCHES.values())
+        self.fetches = fetches or []
+        self.batches = batches or []
+
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def touch(self, symbol):
+        """Note that symbol was just viewed, so it is warmed first."""
+        if not symbol:
+            return
+        with self._recent_lock:
+            self._recent[symbol] = time.time()
+            self._recent.move_to_end(symbol)
+            while len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+
+    def symbols(self):
+        """Symbols to warm: recently viewed first, then the watchlist."""
+        with self._recent_lock:
+            recent = list(reversed(self._recent))
+        watchlist = self.config.get("watchlist", [])
+        return recent + [s for s in watchlist if s not in recent]
+
+    def in_market_hours(self, now=None):
+        now = now or pd.Timestamp.now(tz=MARKET_TZ)
+        if now.weekday() >= 5:
+            return False
+        opens, closes = self.hours
+        return opens <= now.strftime("%H:%M") < closes
+
+    def prefetch(self, symbol):
+        for fetch in self.fetches:
+            if self._stop.is_set():
+                return
+            self.limiter.acquire()
+            try:
+                fetch(symbol)
+            except Exception as e:
+                print(f"Could not prefetch '{symbol}'.")
+                print(e)
+
+    def prefetch_batch(self, symbols):
+        for fetch in self.batches:
+            if self._stop.is_set():
+                return
+            self.limiter.acquire()
+            try:
+                _, errors = fetch(symbols)
+                for symbol, error in errors.items():
+                    print(f"Could not prefetch '{symbol}': {error}")
+            except Exception as e:
+                print(f"Could not prefetch {', '.join(symbols)}.")
+                print(e)
+
+    def run_once(self):
+        symbols = self.symbols()
+        chunks = [
+            symbols[i:i + self.batch]
+            for i in range(0, len(symbols), self.batch)
+        ]
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix="rhdash-prefetch") as pool:
+            list(pool.map(self.prefetch_batch, chunks))
+            list(pool.map(self.prefetch, symbols))
+
+    def run(self):
+        self.run_once()
+        while not self._stop.wait(self.period):
+            if self.in_market_hours():
+                self.run_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run,
+                                        name="rhdash-prefetch",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def lead(path=LEADER_LOCK):
+    """Try to become the one process on this host that prefetches.
+
+    The lock is released when the process exits, so a replacement worker
+    can take over.
+    """
+    global _leader
+    import fcntl
+
+    if _leader is not None:
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = open(path, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _leader = lock
+    return True
+
+
+def start_prefetch(config, leader=False):
+    """Start a Prefetcher if robinhood.prefetch.enabled is set.
+
+    With leader set, it only starts in the process that wins the leader
+    lock, for deployments with several worker processes.
+    """
+    global PREFETCHER
+    robinhood_config = config["robinhood"]
+    if "prefetch" in robinhood_config and robinhood_config["prefetch"].get(
+            "enabled"):
+        if leader and not lead():
+            return None
+        PREFETCHER = Prefetcher(config).start()
+        return PREFETCHER
+    return None
+
+
+def touch(symbol):
+    """Tell the running Prefetcher, if any, that symbol was just viewed."""
+    if PREFETCHER is not None:
+        PREFETCHER.touch(symbol)
@@ -0,0 +1,194 @@
+"""Market data providers behind rhdash.rh."""
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from os.path import expanduser
+from os.path import isfile
+from os.path import join
+
+import robin_stocks
+
+from rhdash.bars import INTERVAL_SPANS
+from rhdash.bars import SPAN_SECONDS
+from rhdash.config import DATA_DIR
+
+MODES = ["live", "record", "replay"]
+
+DEFAULT_FIXTURES = join(DATA_DIR, "fixtures")
+
+LOGIN_LOCK = join(DATA_DIR, "login.lock")
+
+# Bar interval robin_stocks 1.0 picks for each span; it takes no interval
+SPAN_INTERVALS = {
+    "day": "5minute",
+    "week": "10minute",
+    "month": "hour",
+    "3month": "hour",
+    "year": "day",
+    "5year": "week"
+}
+
+
+def serves(interval, span):
+    """Whether historicals(span, interval=interval) covers all of span."""
+    if hasattr(robin_stocks.stocks, "get_stock_historicals"):
+        return span in INTERVAL_SPANS.get(interval, [])
+    widened = next((s for s, i in SPAN_INTERVALS.items() if i == interval),
+                   None)
+    return SPAN_INTERVALS.get(span) == interval or (
+        widened is not None and SPAN_SECONDS[widened] >= SPAN_SECONDS[span])
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path, shared by every process on the host."""
+    import fcntl
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class RobinhoodProvider:
+    """Live data from Robinhood through robin_stocks.
+
+    fundamentals, quotes and historicals take one symbol or a list of them;
+    every item in the response carries its "symbol".
+    """
+    def login(self, user, passwd):
+        """Log in, reusing the session token robin_stocks stores on disk.
+
+        Concurrent logins from several processes are serialized, so only
+        the first one goes through 2FA and the rest load its token.
+        """
+        with file_lock(LOGIN_LOCK):
+            robin_stocks.login(user, passwd, by_sms=True, store_session=True)
+
+    def session(self):
+        return robin_stocks.helper.SESSION
+
+    def watchlist(self):
+        return robin_stocks.account.get_watchlist_by_name()
+
+    def symbol_by_url(self, url):
+        return robin_stocks.stocks.get_symbol_by_url(url)
+
+    def instrument_by_url(self, url):
+        return robin_stocks.stocks.get_instrument_by_url(url)
+
+    def name(self, symbol):
+        return robin_stocks.stocks.get_name_by_symbol(symbol)
+
+    def instruments(self):
+        """Every instrument upstream lists, a few thousand per page."""
+        return robin_stocks.helper.request_get(
+            robin_stocks.urls.instruments(), "pagination")
+
+    def fundamentals(self, symbols):
+        return robin_stocks.stocks.get_fundamentals(symbols)
+
+    def quotes(self, symbols):
+        return robin_stocks.stocks.get_quotes(symbols)
+
+    def historicals(self, symbols, span, bounds="regular", interval=None):
+        """Bars over span, every interval or SPAN_INTERVALS[span].
+
+        Releases before 1.5 cannot be asked for an interval. There the
+        shortest span with that interval is fetched instead, which covers
+        the requested span.
+        """
+        interval = interval or SPAN_INTERVALS.get(span, "hour")
+        stocks = robin_stocks.stocks
+        if hasattr(stocks, "get_stock_historicals"):
+            return stocks.get_stock_historicals(symbols,
+                                                interval=interval,
+                                                span=span,
+                                                bounds=bounds)
+        if SPAN_INTERVALS.get(span) != interval:
+            span = next((s for s, i in SPAN_INTERVALS.items()
+                         if i == interval), span)
+        return stocks.get_historicals(symbols, span=span, bounds=bounds)
+
+
+def fixture_name(method, args):
+    """File name for a recorded call, readable but unique per arguments."""
+    encoded = json.dumps([method] + list(args), sort_keys=True)
+    digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:12]
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", "_".join(str(a) for a in args))
+    return f"{method}-{slug.strip('_')[:48]}-{digest}.json.gz"
+
+
+class RecordingProvider:
+    """Passes calls through to another provider and saves each response."""
+    def __init__(self, inner, fixtures=DEFAULT_FIXTURES):
+        self.inner = inner
+        self.fixtures = expanduser(fixtures)
+        os.makedirs(self.fixtures, exist_ok=True)
+
+    def __getattr__(self, method):
+        call = getattr(self.inner, method)
+        if method in ("login", "session"):
+            return call
+
+        def record(*args):
+            response = call(*args)
+            path = join(self.fixtures, fixture_name(method, args))
+            with gzip.open(path, "wt", encoding="utf-8") as fixture:
+                json.dump(response, fixture)
+            return response
+
+        return record
+
+
+class ReplayProvider:
+    """Serves recorded responses from disk after a synthetic delay.
+
+    Calls that were never recorded answer None, like a failed request.
+    """
+    def __init__(self, fixtures=DEFAULT_FIXTURES, latency=0.0):
+        self.fixtures = expanduser(fixtures)
+        self.latency = float(latency)
+
+    def login(self, user, passwd):
+        pass
+
+    def session(self):
+        return robin_stocks.helper.SESSION
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def replay(*args):
+            if self.latency > 0:
+                time.sleep(self.latency)
+            path = join(self.fixtures, fixture_name(method, args))
+            if not isfile(path):
+                print(f"No recorded response for {method}{args}.")
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as fixture:
+                return json.load(fixture)
+
+        return replay
+
+
+def provider_from(robinhood_config):
+    """Provider selected by the "provider" section of the config."""
+    provider_config = robinhood_config[
+        "provider"] if "provider" in robinhood_config else {}
+    mode = provider_config.get("mode", "live")
+    fixtures = provider_config.get("fixtures", DEFAULT_FIXTURES)
+
+    if mode == "record":
+        return RecordingProvider(RobinhoodProvider(), fixtures)
+    if mode == "replay":
+        return ReplayProvider(fixtures, provider_config.get("latency", 0.0))
+    return RobinhoodProvider()
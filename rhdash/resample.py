@@ -0,0 +1,122 @@
+"""Coarser OHLCV bars built from finer ones, within market sessions."""
+from rhdash.bars import DAY
+from rhdash.bars import STAMP_FORMAT
+
+MARKET_TZ = "US/Eastern"
+
+INTERVAL_SECONDS = {
+    "5minute": 5 * 60,
+    "10minute": 10 * 60,
+    "15minute": 15 * 60,
+    "30minute": 30 * 60,
+    "hour": 60 * 60,
+    "4hour": 4 * 60 * 60,
+    "day": DAY,
+    "week": 7 * DAY
+}
+
+# Where each session starts, in minutes after midnight market time.
+# Intraday bars are counted from the start of their own session, so
+# none spans two sessions.
+SESSION_OPENS = {"pre": 4 * 60, "reg": 9 * 60 + 30, "post": 16 * 60}
+
+REGULAR = ("reg", )
+
+
+def divides(source, interval):
+    """Whether bars at interval can be built from whole bars at source."""
+    if source not in INTERVAL_SECONDS or interval not in INTERVAL_SECONDS:
+        return False
+    if INTERVAL_SECONDS[interval] >= DAY:
+        return INTERVAL_SECONDS[source] <= INTERVAL_SECONDS[interval] and (
+            source != "week" or interval == "week")
+    return INTERVAL_SECONDS[interval] % INTERVAL_SECONDS[source] == 0
+
+
+def bucket_starts(begins_at, sessions, source, interval):
+    """UTC start of the interval bar each source bar falls into.
+
+    Daily and coarser source bars begin at midnight UTC on their market
+    date; intraday ones are dated in market time.
+    """
+    import pandas as pd
+
+    if INTERVAL_SECONDS[source] >= DAY:
+        local = begins_at.tz_localize(None)
+    else:
+        local = begins_at.tz_convert(MARKET_TZ).tz_localize(None)
+    dates = local.normalize()
+
+    if INTERVAL_SECONDS[interval] >= DAY:
+        if interval == "week":
+            dates = dates - pd.to_timedelta(dates.weekday, unit="D")
+        return dates.tz_localize("UTC")
+
+    opens = pd.to_timedelta(
+        [SESSION_OPENS.get(s, SESSION_OPENS["reg"]) for s in sessions],
+        unit="m")
+    anchors = dates + opens
+    step = pd.Timedelta(seconds=INTERVAL_SECONDS[interval])
+    starts = anchors + ((local - anchors) // step) * step
+    return starts.tz_localize(MARKET_TZ).tz_convert("UTC")
+
+
+def resample(bars, source, interval, sessions=REGULAR):
+    """Bars at interval aggregated from bars at source, oldest first.
+
+    bars are shaped like get_historicals output, oldest first, and so is
+    the result. Only bars in sessions are used; None keeps every session.
+    Each output bar takes the first open, highest high, lowest low, last
+    close and total volume of the bars it covers.
+    """
+    if not divides(source, interval):
+        raise ValueError(f"Cannot build {interval} bars from {source} bars.")
+    if sessions is not None:
+        bars = [
+            bar for bar in bars
+            if bar and (bar.get("session") or "reg") in sessions
+        ]
+    if source == interval:
+        return bars
+    bars = [bar for bar in bars if bar]
+    if not bars:
+        return []
+    import numpy as np
+    import pandas as pd
+
+    columns = {
+        field: np.array([bar[field] for bar in bars], dtype=float)
+        for field in ("open_price", "high_price", "low_price", "close_price",
+                      "volume")
+    }
+    bar_sessions = np.array([bar.get("session") or "reg" for bar in bars])
+    begins_at = pd.DatetimeIndex(
+        pd.to_datetime([bar["begins_at"] for bar in bars], utc=True))
+    starts = bucket_starts(begins_at, bar_sessions, source, interval)
+
+    keys = starts.asi8
+    changed = keys[1:] != keys[:-1]
+    if INTERVAL_SECONDS[interval] < DAY:
+        changed |= bar_sessions[1:] != bar_sessions[:-1]
+    first = np.concatenate([[0], np.flatnonzero(changed) + 1])
+    last = np.append(first[1:], len(bars)) - 1
+
+    opens = columns["open_price"][first]
+    highs = np.maximum.reduceat(columns["high_price"], first)
+    lows = np.minimum.reduceat(columns["low_price"], first)
+    closes = columns["close_price"][last]
+    volumes = np.add.reduceat(columns["volume"], first)
+    stamps = starts[first].strftime(STAMP_FORMAT)
+
+    symbol = bars[0].get("symbol")
+    return [{
+        "begins_at": stamps[i],
+        "open_price": float(opens[i]),
+        "close_price": float(closes[i]),
+        "high_price": float(highs[i]),
+        "low_price": float(lows[i]),
+        "volume": int(volumes[i]),
+        "session": str(bar_sessions[first[i]]),
+        "interpolated": False,
+        "symbol": symbol
+    } for i in range(len(first))]
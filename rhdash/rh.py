@@ -1,6 +1,218 @@
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FetchTimeout
+from functools import wraps
 
-import robin_stocks
+from requests.adapters import HTTPAdapter
+
+from rhdash.bars import DEFAULT_BARS_PATH
+from rhdash.bars import INTERVAL_SPANS
+from rhdash.bars import SPAN_SECONDS
+from rhdash.bars import BarStore
+from rhdash.bars import to_seconds
+from rhdash.cache import MISSING
+from rhdash.cache import SingleFlight
+from rhdash.cache import TTLCache
+from rhdash.metrics import UPSTREAM_COALESCED
+from rhdash.metrics import InstrumentedProvider
+from rhdash.metrics import watch_cache
+from rhdash.providers import RobinhoodProvider
+from rhdash.providers import provider_from
+from rhdash.providers import serves
+from rhdash.resample import INTERVAL_SECONDS
+from rhdash.resample import REGULAR
+from rhdash.resample import divides
+from rhdash.resample import resample
+
+CACHE = TTLCache()
+watch_cache("upstream", CACHE)
+
+# Upstream fetches in progress, shared by every caller wanting the same one
+FLIGHTS = SingleFlight()
+
+PROVIDER = InstrumentedProvider(RobinhoodProvider())
+
+BARS = None
+
+POOL = {"workers": 8, "connections": 16}
+
+# Seconds to wait on upstream: for all of a symbol's data, for each HTTP
+# request, and per endpoint where that should be shorter than the budget
+DEADLINES = {"budget": 5.0, "http": 30.0, "timeout": {}}
+
+# Most symbols upstream accepts in one request, per endpoint
+BATCH = {"fundamentals": 100, "quotes": 100, "historicals": 75}
+
+SPAN_BOUNDS = {"day": "extended"}
+
+# Interval of the bars each graph is drawn with; set from robinhood.intervals
+VIEW_INTERVALS = {"day": "5minute", "week": "10minute", "year": "day"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Lookups answered locally before CACHE and upstream, by endpoint
+LOCAL = {}
+
+# Called in a freshly forked worker, after rhdash's own state is reset
+_fork_callbacks = []
+
+
+def configure_provider(robinhood_config):
+    """Pick the live, recording or replaying provider from config."""
+    global PROVIDER
+    PROVIDER = InstrumentedProvider(provider_from(robinhood_config))
+
+
+def configure_bars(robinhood_config):
+    """Open the local bar store unless the config turns it off."""
+    global BARS
+    bars_config = robinhood_config[
+        "bars"] if "bars" in robinhood_config else {}
+    if bars_config.get("enabled", True):
+        BARS = BarStore(bars_config.get("path", DEFAULT_BARS_PATH),
+                        bars_config.get("fresh_for"))
+    else:
+        BARS = None
+
+
+def configure_intervals(robinhood_config):
+    """Interval of each graph's bars, e.g. "hour" for the week graph."""
+    if "intervals" in robinhood_config:
+        for span, interval in robinhood_config["intervals"].items():
+            if span in VIEW_INTERVALS and interval in INTERVAL_SECONDS:
+                VIEW_INTERVALS[span] = interval
+            else:
+                print(f"Unknown interval '{interval}' for the {span} graph.")
+
+
+def configure_cache(robinhood_config):
+    """Size and freshness windows for cached upstream responses."""
+    if "cache" in robinhood_config:
+        CACHE.configure(robinhood_config["cache"])
+
+
+def cache_stats():
+    return dict(CACHE.stats(), **FLIGHTS.stats())
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """HTTPAdapter giving every request a timeout unless it has its own."""
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def configure_deadlines(robinhood_config):
+    """How long callers wait for upstream before rendering without it."""
+    if "deadlines" in robinhood_config:
+        deadlines = robinhood_config["deadlines"]
+        for key in ("budget", "http"):
+            if key in deadlines:
+                DEADLINES[key] = float(deadlines[key])
+        if "timeout" in deadlines:
+            DEADLINES["timeout"].update(deadlines["timeout"])
+
+
+def configure_pool(robinhood_config):
+    """Size the fetch thread pool and the shared HTTP connection pool.
+
+    Every request through the pool times out after DEADLINES["http"], so a
+    hung call cannot hold a fetch thread forever.
+    """
+    if "pool" in robinhood_config:
+        POOL.update(robinhood_config["pool"])
+
+    adapter = TimeoutAdapter(DEADLINES["http"],
+                             pool_connections=int(POOL["connections"]),
+                             pool_maxsize=int(POOL["connections"]))
+    session = PROVIDER.session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def configure_batch(robinhood_config):
+    """Symbols per upstream request for the batch fetches."""
+    if "batch" in robinhood_config:
+        BATCH.update(robinhood_config["batch"])
+
+
+def executor():
+    """Thread pool shared by every concurrent upstream fetch."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(POOL["workers"]),
+                                           thread_name_prefix="rhdash-fetch")
+        return _executor
+
+
+def at_fork(callback):
+    """Have after_fork call callback() in every new worker process."""
+    _fork_callbacks.append(callback)
+
+
+def after_fork():
+    """Make state inherited from a pre-fork master safe to use.
+
+    Threads do not survive a fork and sockets and SQLite connections must
+    not be shared, so the worker gets its own fetch pool, HTTP connections
+    and database connections. The session's login is kept.
+    """
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    configure_pool({})
+    if BARS is not None:
+        BARS.reopen()
+    for callback in _fork_callbacks:
+        callback()
+
+
+def answer_locally(endpoint, lookup):
+    """Serve endpoint from lookup(*args) whenever that finds something."""
+    LOCAL[endpoint] = lookup
+
+
+def cached(endpoint):
+    """Serve repeated calls from CACHE while they are still fresh.
+
+    Calls a LOCAL lookup answers never get that far. Concurrent misses for
+    the same arguments make a single upstream call and share its result.
+    Failed fetches (None, empty results) are never cached.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            if endpoint in LOCAL:
+                value = LOCAL[endpoint](*args)
+                if value:
+                    return value
+            key = (endpoint, ) + args
+
+            def fetch():
+                value = func(*args)
+                if value and value != [None]:
+                    CACHE.put(key, value)
+                return value
+
+            value = CACHE.get(key)
+            if value is MISSING:
+                value, shared = FLIGHTS.do(key, fetch)
+                if shared:
+                    UPSTREAM_COALESCED.inc(endpoint)
+            return value
+
+        return wrapper
+
+    return decorator
 
 
 def login_using(robinhood_config):
@@ -14,68 +226,383 @@ def login_using(robinhood_config):
                 passwd = creds["password"]
 
     try:
-        robin_stocks.login(user, passwd, by_sms=True)
+        PROVIDER.login(user, passwd)
     except Exception:
         print("Could not log into RobinHood.")
         sys.exit(1)
 
 
+@cached("watchlist")
 def get_watchlist(name="Default"):
     try:
-        return robin_stocks.account.get_watchlist_by_name()
+        return PROVIDER.watchlist()
     except Exception as e:
         print("Could not get for watchlist.")
         return None
 
 
+@cached("symbol_by_url")
 def get_symbol_by_url(url):
     try:
-        return robin_stocks.stocks.get_symbol_by_url(url)
+        return PROVIDER.symbol_by_url(url)
     except Exception as e:
         print(f"Could not get symbol for {url}.")
         return None
 
 
+@cached("instrument")
+def get_instrument_by_url(url):
+    try:
+        return PROVIDER.instrument_by_url(url)
+    except Exception as e:
+        print(f"Could not get instrument for {url}.")
+        return None
+
+
+def get_all_instruments():
+    """Every instrument upstream lists; slow, so never cached."""
+    try:
+        instruments = PROVIDER.instruments()
+        return [i for i in instruments or [] if i]
+    except Exception as e:
+        print("Could not get instruments.")
+        return None
+
+
+@cached("name")
 def get_name(symbol):
     try:
-        return robin_stocks.stocks.get_name_by_symbol(symbol)
+        return PROVIDER.name(symbol)
     except Exception as e:
-        print("Could not get name for '{symbol}'.")
+        print(f"Could not get name for '{symbol}'.")
         return ""
 
 
+@cached("fundamentals")
 def get_fundamentals(symbol):
     try:
-        return robin_stocks.stocks.get_fundamentals(symbol)
+        return PROVIDER.fundamentals(symbol)
     except Exception as e:
-        print("Could not get fundamentals for '{symbol}'.")
+        print(f"Could not get fundamentals for '{symbol}'.")
         return None
 
 
+def source_interval(span):
+    """Interval upstream is asked for to draw span's graph.
+
+    With BARS on this is the finest interval upstream serves over span,
+    so graphs that can be built from the same bars share them. Otherwise
+    the graph's own interval is fetched where upstream serves it.
+    """
+    interval = VIEW_INTERVALS[span]
+    candidates = list(INTERVAL_SPANS)
+    if BARS is None:
+        candidates.insert(0, interval)
+    return next((source for source in candidates
+                 if divides(source, interval) and serves(source, span)),
+                interval)
+
+
+def view_bars(span, source, data):
+    """Bars at source resampled for span's graph; failures pass through."""
+    if not data or data == [None]:
+        return data
+    sessions = None if SPAN_BOUNDS.get(span) == "extended" else REGULAR
+    return resample(data, source, VIEW_INTERVALS[span], sessions)
+
+
+def store_day_bars(symbol, interval, data, now):
+    """Keep the day graph's bars in BARS, unless they would leave a gap.
+
+    They then stand in for a sync of the last day, so the week graph can
+    be built from them without asking upstream again.
+    """
+    last, _ = BARS.state(symbol, interval)
+    if last is None or now - to_seconds(last) < SPAN_SECONDS["day"]:
+        BARS.merge(symbol, interval, data, synced_at=now, reach="day")
+
+
+@cached("day")
 def get_day_data(symbol):
     try:
-        data = robin_stocks.stocks.get_historicals(symbol,
-                                                   span="day",
-                                                   bounds="extended")
-        return data
+        source = source_interval("day")
+        data = PROVIDER.historicals(symbol, "day", "extended", source)
+        if BARS is not None and data and data != [None]:
+            store_day_bars(symbol, source, data, time.time())
+        return view_bars("day", source, data)
     except Exception as e:
-        print("Could not get day data for '{symbol}'.")
+        print(f"Could not get day data for '{symbol}'.")
         return None
 
 
+def synced_historicals(symbol, interval, span):
+    """Historicals read from BARS, fetching upstream only what is missing."""
+    def fetch(fetch_span):
+        return PROVIDER.historicals(symbol, fetch_span, "regular", interval)
+
+    return BARS.sync(symbol, interval, span, fetch)
+
+
+def span_historicals(symbol, span):
+    """Bars for the week or year graph, resampled where they need to be.
+
+    With BARS on they are read from there. If they are built from the
+    same bars as the day graph, those are fetched first, which usually
+    leaves upstream nothing more to be asked.
+    """
+    source = source_interval(span)
+    if BARS is not None:
+        if source == source_interval("day"):
+            get_day_data(symbol)
+        data = synced_historicals(symbol, source, span)
+    else:
+        data = PROVIDER.historicals(symbol, span,
+                                    SPAN_BOUNDS.get(span, "regular"), source)
+    return view_bars(span, source, data)
+
+
+@cached("week")
 def get_week_data(symbol):
     try:
-        data = robin_stocks.stocks.get_historicals(symbol, span="week")
-        return data
+        return span_historicals(symbol, "week")
     except Exception as e:
-        print("Could not get week data for '{symbol}'.")
+        print(f"Could not get week data for '{symbol}'.")
         return None
 
 
+@cached("year")
 def get_year_data(symbol):
     try:
-        data = robin_stocks.stocks.get_historicals(symbol, span="year")
-        return data
+        return span_historicals(symbol, "year")
     except Exception as e:
-        print("Could not get year data for '{symbol}'.")
+        print(f"Could not get year data for '{symbol}'.")
         return None
+
+
+SYMBOL_FETCHES = {
+    "name": get_name,
+    "fundamentals": get_fundamentals,
+    "day": get_day_data,
+    "week": get_week_data,
+    "year": get_year_data
+}
+
+
+def fetch_symbol_data(symbol, budget=None):
+    """Fetch everything the dashboard shows for symbol, concurrently.
+
+    Returns a dict keyed like SYMBOL_FETCHES within budget seconds
+    (DEADLINES["budget"] by default), or sooner for endpoints with a
+    shorter DEADLINES timeout. Whatever is late or failed is given its
+    last cached value, if any, and listed under "stale", or is None and
+    listed under "pending" while it is still being fetched. Late fetches
+    carry on and cache their result, so asking again fills them in; they
+    are also listed under "late". Failed ones are not.
+    """
+    data = {"stale": [], "pending": [], "late": []}
+    if not symbol:
+        data.update({field: None for field in SYMBOL_FETCHES})
+        return data
+
+    budget = DEADLINES["budget"] if budget is None else float(budget)
+    start = time.monotonic()
+    # Fetches already in flight are waited on directly, so polling for
+    # a hung endpoint never ties up more workers than the fetch itself
+    futures = {
+        field: FLIGHTS.pending((field, symbol))
+        or executor().submit(fetch, symbol)
+        for field, fetch in SYMBOL_FETCHES.items()
+    }
+    for field, future in futures.items():
+        timeout = min(float(DEADLINES["timeout"].get(field, budget)), budget)
+        late = False
+        try:
+            data[field] = future.result(
+                max(start + timeout - time.monotonic(), 0))
+        except FetchTimeout:
+            data[field] = None
+            data["late"].append(field)
+            late = True
+        except Exception as e:
+            print(f"Could not get {field} for '{symbol}'.")
+            print(e)
+            data[field] = None
+
+        if data[field] and data[field] != [None]:
+            continue
+        stale = CACHE.stale((field, symbol))
+        if stale is not MISSING:
+            data[field] = stale
+            data["stale"].append(field)
+        elif late:
+            data["pending"].append(field)
+    return data
+
+
+def fetch_chunks(symbols, size, fetch):
+    """Call fetch(chunk) concurrently for chunks of at most size symbols.
+
+    Returns ({symbol: [items]}, {symbol: error}), grouping the response
+    items by their "symbol". A failed request fails every symbol in its
+    chunk; symbols missing from a response fail on their own.
+    """
+    chunks = [
+        symbols[i:i + max(int(size), 1)]
+        for i in range(0, len(symbols), max(int(size), 1))
+    ]
+
+    def fetch_chunk(chunk):
+        try:
+            return fetch(chunk), None
+        except Exception as e:
+            return None, str(e)
+
+    items = {}
+    errors = {}
+    for chunk, (data, error) in zip(chunks, executor().map(fetch_chunk,
+                                                           chunks)):
+        if error or not data or data == [None]:
+            errors.update(dict.fromkeys(chunk, error or "request failed"))
+            continue
+        for item in data:
+            if item and item.get("symbol") in chunk:
+                items.setdefault(item["symbol"], []).append(item)
+        for symbol in chunk:
+            if symbol not in items:
+                errors[symbol] = "no data returned"
+    return items, errors
+
+
+def cached_batch(endpoint, symbols, fetch_missing):
+    """Per-symbol results from CACHE, fetching the rest in one batch.
+
+    fetch_missing(symbols) returns (results, errors) like fetch_chunks.
+    Results are cached under the same keys as the single-symbol fetches.
+    """
+    symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols))
+    results = {}
+    missing = []
+    for symbol in symbols:
+        value = CACHE.get((endpoint, symbol))
+        if value is MISSING:
+            missing.append(symbol)
+        else:
+            results[symbol] = value
+
+    errors = {}
+    if missing:
+        fetched, errors = fetch_missing(missing)
+        for symbol, value in fetched.items():
+            if value and value != [None]:
+                CACHE.put((endpoint, symbol), value)
+            results[symbol] = value
+    return results, errors
+
+
+def get_fundamentals_batch(symbols):
+    """({symbol: fundamentals}, {symbol: error}) in as few requests as can be.
+
+    Each result is shaped like get_fundamentals(symbol).
+    """
+    return cached_batch(
+        "fundamentals", symbols, lambda missing: fetch_chunks(
+            missing, BATCH["fundamentals"], PROVIDER.fundamentals))
+
+
+def get_quotes_batch(symbols):
+    """({symbol: quote}, {symbol: error}) in as few requests as can be."""
+    def fetch_quotes(missing):
+        items, errors = fetch_chunks(missing, BATCH["quotes"], PROVIDER.quotes)
+        return {symbol: quote[0] for symbol, quote in items.items()}, errors
+
+    return cached_batch("quote", symbols, fetch_quotes)
+
+
+def synced_batch(symbols, interval, span):
+    """Historicals for symbols from BARS, each synced in a shared request.
+
+    Symbols are grouped by the span they need to catch up, so symbols that
+    are fresh cost nothing and the rest cost one request per chunk.
+    """
+    now = time.time()
+    groups = {}
+    for symbol in symbols:
+        groups.setdefault(BARS.fetch_span(symbol, interval, span, now),
+                          []).append(symbol)
+
+    failed = {}
+    for fetch_span, group in groups.items():
+        if fetch_span is None:
+            continue
+        items, errors = fetch_chunks(
+            group, BATCH["historicals"], lambda chunk: PROVIDER.historicals(
+                chunk, fetch_span, SPAN_BOUNDS.get(span, "regular"),
+                interval))
+        reach = span if fetch_span == span else None
+        for symbol, bars in items.items():
+            BARS.merge(symbol, interval, bars, synced_at=now, reach=reach)
+        failed.update(errors)
+
+    results = {}
+    errors = {}
+    for symbol in symbols:
+        bars = BARS.window(symbol, interval, span)
+        if bars:
+            results[symbol] = bars
+        else:
+            errors[symbol] = failed.get(symbol, "no data stored")
+    return results, errors
+
+
+def get_historicals_batch(symbols, span):
+    """({symbol: bars}, {symbol: error}) for span "day", "week" or "year".
+
+    Each result is shaped like get_day_data, get_week_data or get_year_data
+    and shares their cache entries.
+    """
+    def fetch_historicals(missing):
+        source = source_interval(span)
+        if BARS is not None and span != "day":
+            if source == source_interval("day"):
+                get_historicals_batch(missing, "day")
+            items, errors = synced_batch(missing, source, span)
+        else:
+            items, errors = fetch_chunks(
+                missing, BATCH["historicals"],
+                lambda chunk: PROVIDER.historicals(
+                    chunk, span, SPAN_BOUNDS.get(span, "regular"), source))
+            if BARS is not None:
+                now = time.time()
+                for symbol, bars in items.items():
+                    store_day_bars(symbol, source, bars, now)
+        return {
+            symbol: view_bars(span, source, bars)
+            for symbol, bars in items.items()
+        }, errors
+
+    return cached_batch(span, symbols, fetch_historicals)
+
+
+# Batch variants of SYMBOL_FETCHES, each taking a list of symbols
+BATCH_FETCHES = {
+    "fundamentals": get_fundamentals_batch,
+    "day": lambda symbols: get_historicals_batch(symbols, "day"),
+    "week": lambda symbols: get_historicals_batch(symbols, "week"),
+    "year": lambda symbols: get_historicals_batch(symbols, "year")
+}
+
+
+def year_closes(symbols):
+    """{symbol: daily closes over the last year}, read locally if possible.
+
+    Every symbol goes through get_historicals_batch, which only asks
+    upstream for the bars that are missing or out of date. With BARS on,
+    the closes are then read straight from there.
+    """
+    fetched, _ = get_historicals_batch(symbols, "year")
+    if BARS is not None and source_interval("year") == "day":
+        return BARS.closes(list(fetched), "day", "year")
+    return {
+        symbol: [float(bar["close_price"]) for bar in data if bar]
+        for symbol, data in fetched.items() if data
+    }
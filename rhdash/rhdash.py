@@ -1,12 +1,14 @@
 """Module dosctring"""
 from rhdash.app import create_app
 from rhdash.args import setup_args
+from rhdash.startup import mark
 
 
 def run_with(arguments):
     """Main entrypoint."""
     if arguments:
         app = create_app(arguments)
+        mark("serving")
         app.run_server(port=str(arguments.port))
         return True
 
@@ -0,0 +1,39 @@
+"""Where each watchlist symbol closed relative to its EMAs."""
+import numpy as np
+import pandas as pd
+
+from rhdash.alg import ema_series
+from rhdash.alg import percent_diff
+
+
+def close_matrix(closes):
+    """Symbols and their closes as rows, left-padded with NaN."""
+    symbols = sorted(symbol for symbol in closes if len(closes[symbol]))
+    width = max((len(closes[symbol]) for symbol in symbols), default=0)
+    matrix = np.full((len(symbols), width), np.nan)
+    for row, symbol in enumerate(symbols):
+        values = closes[symbol]
+        matrix[row, width - len(values):] = values
+    return symbols, matrix
+
+
+def screen(closes, ema_days):
+    """Last close, EMAs and percent distance to each EMA for every symbol.
+
+    closes maps symbol to closes, oldest first. Every symbol and every
+    period is computed in one batched pass. EMAs longer than a symbol's
+    history are NaN.
+    """
+    symbols, matrix = close_matrix(closes)
+    table = pd.DataFrame({"symbol": symbols})
+    if not symbols:
+        return table
+
+    last = matrix[:, -1]
+    table["close"] = last
+    emas = ema_series(ema_days, matrix)
+    for n_days in ema_days:
+        ema = emas[n_days][:, -1]
+        table[f"ema_{n_days}"] = ema
+        table[f"diff_{n_days}"] = percent_diff(last, ema)
+    return table
@@ -0,0 +1,24 @@
+"""Gunicorn settings for serving rhdash from several worker processes.
+
+    gunicorn -c python:rhdash.serving
+
+The app is built once in the master, so login and watchlist resolution
+happen once. Workers are forked from it, reopen their own connections and
+share upstream responses through the SQLite cache. RHDASH_BIND and
+RHDASH_WORKERS override the defaults below.
+"""
+import multiprocessing
+import os
+
+from rhdash.rh import after_fork
+
+wsgi_app = "rhdash.app:create_server(prefork=True)"
+preload_app = True
+bind = os.environ.get("RHDASH_BIND", "0.0.0.0:8050")
+workers = int(
+    os.environ.get("RHDASH_WORKERS", min(multiprocessing.cpu_count(), 4)))
+timeout = 120
+
+
+def post_fork(server, worker):
+    after_fork()
@@ -0,0 +1,95 @@
+"""Startup work that can run after the server is already listening."""
+import hmac
+import threading
+import time
+
+from flask import Response
+from flask import jsonify
+from flask import request
+
+from rhdash import STARTED
+
+# Seconds from STARTED to each startup milestone
+TIMINGS = {}
+
+HEALTH_PATH = "/healthz"
+
+
+def mark(milestone):
+    """Record and print when milestone was first reached."""
+    if milestone not in TIMINGS:
+        TIMINGS[milestone] = time.monotonic() - STARTED
+        print(f"{milestone}: {TIMINGS[milestone]:.2f}s after start.")
+
+
+class Startup:
+    """Runs each step(config) in order, in the background if started.
+
+    `ready` is set once every step has run or one of them has failed;
+    `error` then says what went wrong.
+    """
+    def __init__(self, config, steps):
+        self.config = config
+        self.steps = steps
+        self.error = None
+        self.ready = threading.Event()
+
+    def run(self):
+        step = None
+        try:
+            for step in self.steps:
+                step(self.config)
+        except SystemExit:
+            self.error = f"{step.__name__} failed"
+        except Exception as e:
+            self.error = f"{step.__name__} failed: {e}"
+            print("Could not start up.")
+            print(e)
+        finally:
+            mark("ready")
+            self.ready.set()
+        return self
+
+    def start(self):
+        threading.Thread(target=self.run, name="rhdash-startup",
+                         daemon=True).start()
+        return self
+
+    def wait(self, timeout=None):
+        """True once startup has finished without an error."""
+        return self.ready.wait(timeout) and self.error is None
+
+
+def add_health_check(server, startup):
+    """Unauthenticated endpoint answering as soon as the port is bound."""
+    def health():
+        return jsonify(ready=startup.ready.is_set(), error=startup.error)
+
+    server.add_url_rule(HEALTH_PATH, "rhdash-health", health)
+
+
+def time_first_byte(server):
+    @server.after_request
+    def first_byte(response):
+        mark("first_byte")
+        return response
+
+
+def basic_auth_gate(server, users):
+    """HTTP Basic auth for every route but the health check.
+
+    This does what dash_auth.BasicAuth does, without importing dash_auth,
+    which pulls in chart_studio and takes most of a second to load.
+    """
+    @server.before_request
+    def check_credentials():
+        if request.path == HEALTH_PATH:
+            return None
+        auth = request.authorization
+        if auth and auth.username in users and hmac.compare_digest(
+                str(users[auth.username]), auth.password or ""):
+            return None
+        return Response(
+            "Login Required",
+            status=401,
+            headers={"WWW-Authenticate": 'Basic realm="User Visible Realm"'})
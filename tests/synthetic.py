@@ -0,0 +1,83 @@
+"""Synthetic get_historicals payloads for tests and benchmarks."""
+from datetime import datetime
+from datetime import timedelta
+
+import numpy as np
+
+# span: (interval, bars per session, minutes per bar, sessions)
+SPANS = {
+    "day": ("5minute", 192, 5, 1),
+    "week": ("10minute", 39, 10, 5),
+    "year": ("day", 1, None, 252),
+    "5year": ("week", 1, None, 261)
+}
+
+# First bar of a session, in UTC
+SESSION_OPEN = {"day": (8, 0), "week": (13, 30)}
+
+LAST_SESSION = datetime(2020, 6, 5)
+
+# Regular session in UTC minutes, 9:30 to 16:00 US/Eastern in June
+REGULAR_HOURS = (13 * 60 + 30, 20 * 60)
+
+
+def sessions(span, count):
+    """Trading days (or weeks) ending at LAST_SESSION, oldest first."""
+    step = timedelta(weeks=1) if span == "5year" else timedelta(days=1)
+    days = []
+    day = LAST_SESSION
+    while len(days) < count:
+        if span == "5year" or day.weekday() < 5:
+            days.append(day)
+        day -= step
+    return days[::-1]
+
+
+def bar_times(span):
+    interval, per_session, minutes, count = SPANS[span]
+    times = []
+    for day in sessions(span, count):
+        hour, minute = SESSION_OPEN.get(span, (0, 0))
+        start = day.replace(hour=hour, minute=minute)
+        for i in range(per_session):
+            times.append(start + timedelta(minutes=(minutes or 0) * i))
+    return times
+
+
+def session_of(time):
+    minutes = time.hour * 60 + time.minute
+    if minutes < REGULAR_HOURS[0]:
+        return "pre"
+    if minutes >= REGULAR_HOURS[1]:
+        return "post"
+    return "reg"
+
+
+def synthetic_historicals(span, symbol="SYN", seed=0, start_price=100.0):
+    """List of bar dicts shaped like robin_stocks get_historicals output.
+
+    Prices follow a seeded random walk, so runs are reproducible.
+    """
+    times = bar_times(span)
+    rng = np.random.default_rng(seed)
+
+    opens = start_price * np.exp(
+        np.cumsum(rng.normal(0, 0.01, len(times))))
+    closes = opens * np.exp(rng.normal(0, 0.005, len(times)))
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.004,
+                                                          len(times)))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.004,
+                                                         len(times)))
+    volumes = rng.integers(1000, 1000000, len(times))
+
+    return [{
+        "begins_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "open_price": f"{opens[i]:.6f}",
+        "close_price": f"{closes[i]:.6f}",
+        "high_price": f"{highs[i]:.6f}",
+        "low_price": f"{lows[i]:.6f}",
+        "volume": int(volumes[i]),
+        "session": session_of(time) if span == "day" else "reg",
+        "interpolated": False,
+        "symbol": symbol
+    } for i, time in enumerate(times)]
@@ -0,0 +1,137 @@
+"""Tests for rhdash.alg"""
+import unittest
+
+import numpy as np
+
+from rhdash.alg import INDICATORS
+from rhdash.alg import IndicatorEngine
+from rhdash.alg import ema_n_days
+from rhdash.alg import ema_series
+from rhdash.alg import lttb
+from rhdash.alg import make_indicator
+
+
+def ema_by_row(n_days, close):
+    """Reference EMA, one bar at a time, as the dashboard used to do it."""
+    ema = np.full(len(close), np.nan)
+    if n_days > len(close):
+        return ema
+    ema[n_days - 1] = close[:n_days].sum() / n_days
+    for i in range(n_days, len(close)):
+        ema[i] = ema_n_days(n_days, close[i], ema[i - 1])
+    return ema
+
+
+class TestEMASeries(unittest.TestCase):
+    """ema_series"""
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close = 100 + np.cumsum(rng.normal(0, 1, 252))
+
+    def test_matches_recurrence(self):
+        """Every period matches the per-row recurrence exactly"""
+        ema_days = [5, 10, 20, 50, 100, 150, 200, 3, 8, 13, 21]
+        emas = ema_series(ema_days, self.close)
+        self.assertEqual(sorted(emas), sorted(ema_days))
+        for n_days in ema_days:
+            np.testing.assert_array_equal(emas[n_days],
+                                          ema_by_row(n_days, self.close))
+
+    def test_period_longer_than_data(self):
+        """Periods with too few bars stay NaN"""
+        emas = ema_series([10, 500], self.close)
+        self.assertTrue(np.isnan(emas[500]).all())
+        self.assertFalse(np.isnan(emas[10][9:]).any())
+
+
+class TestLTTB(unittest.TestCase):
+    """lttb"""
+    def test_keeps_shape(self):
+        """Endpoints and the extremes survive downsampling"""
+        values = np.sin(np.linspace(0, 6 * np.pi, 2000))
+        values[:50] = np.nan
+        keep = lttb(values, 200)
+        self.assertEqual(len(keep), 200)
+        self.assertEqual((keep[0], keep[-1]), (50, 1999))
+        self.assertTrue((np.diff(keep) > 0).all())
+        self.assertGreater(values[keep].max(), 0.99)
+        self.assertLess(values[keep].min(), -0.99)
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    """IndicatorEngine"""
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        n = 300
+        close = 100 + np.cumsum(rng.normal(0, 1, n))
+        self.bars = {
+            "time": np.arange(n) * 300,
+            "close": close,
+            "high": close + rng.uniform(0, 1, n),
+            "low": close - rng.uniform(0, 1, n),
+            "volume": rng.integers(100, 1000, n).astype(float),
+            "session": np.arange(n) // 78
+        }
+        self.specs = [{"name": name} for name in INDICATORS]
+
+    def rows(self, start, stop):
+        return {
+            field: column[start:stop]
+            for field, column in self.bars.items()
+        }
+
+    def test_incremental_matches_batch(self):
+        """Continuing a key gives what one batch pass over every bar does"""
+        engine = IndicatorEngine()
+        for spec in self.specs:
+            key = ("TEST", "5minute", spec["name"])
+            engine.compute(key, spec, self.rows(0, 200))
+            for n in range(201, 301, 7):
+                values = engine.compute(key, spec, self.rows(n - 8, n),
+                                        batch=False)
+                self.assertIsNotNone(values)
+            expected = make_indicator(spec).batch(self.rows(0, n))
+            for name, series in expected.items():
+                np.testing.assert_allclose(values[name], series[n - 8:])
+
+    def test_revised_last_bar(self):
+        """A last bar that changed since is stepped again, not twice"""
+        engine = IndicatorEngine()
+        spec = {"name": "ema", "period": 10}
+        key = ("TEST", "5minute", "ema_10")
+        forming = self.rows(0, 100)
+        forming["close"] = forming["close"].copy()
+        forming["close"][-1] += 5
+        engine.compute(key, spec, forming)
+        values = engine.compute(key, spec, self.rows(99, 101), batch=False)
+        expected = make_indicator(spec).batch(self.rows(0, 101))["ema_10"]
+        np.testing.assert_allclose(values["ema_10"], expected[-2:])
+
+    def test_results_kept(self):
+        """Values returned earlier are not changed by later bars"""
+        engine = IndicatorEngine()
+        spec = {"name": "sma", "period": 5}
+        key = ("TEST", "5minute", "sma_5")
+        first = engine.compute(key, spec, self.rows(0, 50))["sma_5"]
+        expected = first.copy()
+        for n in range(51, 120):
+            engine.compute(key, spec, self.rows(n - 2, n), batch=False)
+        np.testing.assert_array_equal(first, expected)
+        values = engine.compute(key, spec, self.rows(0, 120), batch=False)
+        np.testing.assert_allclose(
+            values["sma_5"],
+            make_indicator(spec).batch(self.rows(0, 120))["sma_5"])
+
+    def test_gap_needs_batch(self):
+        """Bars not continuing a key are only computed with batch set"""
+        engine = IndicatorEngine()
+        spec = {"name": "sma", "period": 5}
+        key = ("TEST", "5minute", "sma_5")
+        engine.compute(key, spec, self.rows(0, 50))
+        gap = self.rows(60, 70)
+        self.assertIsNone(engine.compute(key, spec, gap, batch=False))
+        self.assertEqual(len(engine.compute(key, spec, gap)["sma_5"]), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
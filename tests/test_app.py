@@ -0,0 +1,220 @@
+"""Tests for rhdash.app"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from rhdash import app
+from rhdash import data
+from rhdash.startup import Startup
+from tests.synthetic import synthetic_historicals
+
+
+def component_ids(component):
+    """Ids of component and everything under it."""
+    ids = []
+    if getattr(component, "id", None) is not None:
+        ids.append(component.id)
+    children = getattr(component, "children", None)
+    if not isinstance(children, (list, tuple)):
+        children = [children]
+    for child in children:
+        if hasattr(child, "to_plotly_json"):
+            ids.extend(component_ids(child))
+    return ids
+
+
+def build_app():
+    """The dashboard as create_app builds it, with upstream left out."""
+    config = {"dash": {}, "robinhood": {}}
+    startup = Startup(config, []).run()
+
+    def init_using(config):
+        return app.setup_dash(config, startup), startup
+
+    with mock.patch.multiple(app,
+                             fetch_config=lambda arguments: config,
+                             apply_args=lambda config, arguments: config,
+                             init_using=init_using,
+                             watchlist_symbols=lambda config: None,
+                             prefetch_using=lambda config: None):
+        return app.create_app([])
+
+
+def dash_update(client, outputs, inputs, changed, state=None):
+    """{id: {property: value}} sent back for outputs, as the browser asks.
+
+    inputs and state map "id.property" to values, in the callback's order,
+    and changed is the input that changed. Outputs left unchanged are
+    missing from the result.
+    """
+    def props(values):
+        return [{
+            "id": key.split(".")[0],
+            "property": key.split(".")[1],
+            "value": value
+        } for key, value in values.items()]
+
+    targets = [{
+        "id": key.split(".")[0],
+        "property": key.split(".")[1]
+    } for key in outputs]
+    response = client.post(
+        "/_dash-update-component",
+        json={
+            "output": (outputs[0] if len(outputs) == 1 else
+                       ".." + "...".join(outputs) + ".."),
+            "outputs": targets[0] if len(outputs) == 1 else targets,
+            "inputs": props(inputs),
+            "changedPropIds": [changed],
+            "state": props(state or {})
+        })
+    if response.status_code == 204:
+        return {}
+    body = response.get_json()["response"]
+    if "props" in body:
+        return {targets[0]["id"]: body["props"]}
+    return body
+
+
+class TestFibonacciOverlay(unittest.TestCase):
+    """Fibonacci levels are drawn in the browser"""
+    @classmethod
+    def setUpClass(cls):
+        cls.dash_app = build_app()
+        cls.callbacks = {
+            callback["output"]: callback
+            for callback in cls.dash_app._callback_list
+        }
+
+    @staticmethod
+    def dependency_ids(callback):
+        return [item["id"] for item in callback["inputs"] + callback["state"]]
+
+    def test_server_figures_ignore_fibonacci(self):
+        """The graph callbacks on the server take no Fibonacci input"""
+        for span in app.GRAPHS:
+            figure = [
+                callback for output, callback in self.callbacks.items()
+                if f"{span}-figure.data" in output
+            ]
+            self.assertEqual(len(figure), 1)
+            self.assertIsNone(figure[0].get("clientside_function"))
+            for dependency in self.dependency_ids(figure[0]):
+                self.assertNotIn("fib", dependency)
+
+    def test_overlay_matches_controls(self):
+        """Each overlay reads the controls fibonacci_controls builds"""
+        layout_ids = component_ids(self.dash_app.layout)
+        for span, graph in app.GRAPHS.items():
+            overlay = self.callbacks[f"{graph}.figure"]
+            self.assertIsNotNone(overlay.get("clientside_function"))
+            controls = component_ids(app.fibonacci_controls(span))
+            fib = [
+                dependency for dependency in self.dependency_ids(overlay)
+                if "fib" in dependency and dependency != "fib-percentages"
+            ]
+            self.assertEqual(sorted(fib), sorted(controls))
+            for dependency in self.dependency_ids(overlay):
+                self.assertIn(dependency, layout_ids)
+
+
+class TestPanelCallbacks(unittest.TestCase):
+    """Each panel is rebuilt from data.STORE on its own"""
+    @classmethod
+    def setUpClass(cls):
+        cls.dash_app = build_app()
+        cls.client = cls.dash_app.server.test_client()
+
+    def setUp(self):
+        symbol_data = {
+            span: synthetic_historicals(span)
+            for span in data.SPAN_TIMEZONES
+        }
+        symbol_data.update(name="Synthetic", fundamentals=None)
+        self.frames = data.parse_symbol("SYN", symbol_data)
+        data.STORE.put(("symbol", "SYN"), self.frames)
+        self.addCleanup(data.STORE.invalidate, ("symbol", "SYN"))
+
+    def test_ema_toggle(self):
+        """Toggling the EMAs rebuilds the year figure from STORE alone"""
+        listeners = [
+            callback["output"] for callback in self.dash_app._callback_list
+            if any(item["id"] == "year-ema-radio"
+                   for item in callback["inputs"])
+        ]
+        self.assertEqual(listeners, ["year-figure.data"])
+
+        symbol_data = {"symbol": "SYN", "version": self.frames["version"]}
+        traces = {}
+        with mock.patch.object(data, "fetch_symbol_data") as fetch:
+            for toggle in [False, True]:
+                body = dash_update(self.client, ["year-figure.data"], {
+                    "symbol-data.data": symbol_data,
+                    "year-ema-radio.value": toggle
+                }, "year-ema-radio.value")
+                traces[toggle] = len(body["year-figure"]["data"]["data"])
+        fetch.assert_not_called()
+        self.assertGreater(traces[True], traces[False])
+
+
+class TestWatchlist(unittest.TestCase):
+    """Watchlist symbols and the table of buttons for them"""
+    @classmethod
+    def setUpClass(cls):
+        cls.client = build_app().server.test_client()
+
+    def test_symbols(self):
+        """Watchlist instruments resolve to sorted, distinct symbols"""
+        urls = {"u1": "MSFT", "u2": "AAPL", "u3": "MSFT"}
+        watchlist = [{"instrument": url} for url in urls]
+        index = SimpleNamespace(resolve=lambda wanted: urls)
+        config = {}
+        with mock.patch.multiple(app,
+                                 get_watchlist=lambda: watchlist,
+                                 instrument_index=lambda path: index):
+            self.assertEqual(app.watchlist_symbols(config),
+                             ["AAPL", "MSFT"])
+        self.assertEqual(config["watchlist"], ["AAPL", "MSFT"])
+        with mock.patch.object(app, "get_watchlist", lambda: None):
+            self.assertIsNone(app.watchlist_symbols(config))
+
+    def test_table(self):
+        """One pattern-matching button per symbol, filled column by column"""
+        symbols = [chr(ord("A") + i) for i in range(9)]
+        table = app.watchlist_table(symbols)
+        self.assertEqual(component_ids(table), [{
+            "type": "watch-button",
+            "symbol": symbol
+        } for symbol in "ACEGIBDFH"])
+        self.assertEqual(component_ids(app.watchlist_table([])), [])
+
+    def update(self, symbols, shown):
+        with mock.patch.object(app, "watchlist_symbols",
+                               lambda config: symbols):
+            return dash_update(
+                self.client, [
+                    "watchlist-table.children", "watchlist-symbols.data",
+                    "startup-poll.disabled"
+                ], {
+                    "startup-poll.n_intervals": 1,
+                    "watchlist-poll.n_intervals": 1
+                }, "watchlist-poll.n_intervals",
+                {"watchlist-symbols.data": shown})
+
+    def test_rendered_on_change(self):
+        """The table is only sent again when the symbols change"""
+        body = self.update(["AAPL", "MSFT"], ["AAPL", "MSFT"])
+        self.assertNotIn("watchlist-table", body)
+        self.assertNotIn("watchlist-symbols", body)
+
+        body = self.update(["AAPL", "TSLA"], ["AAPL", "MSFT"])
+        self.assertEqual(body["watchlist-symbols"]["data"],
+                         ["AAPL", "TSLA"])
+        self.assertIn("watchlist-table", body)
+
+        body = self.update(None, ["AAPL", "MSFT"])
+        self.assertNotIn("watchlist-table", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Tests for rhdash.bars"""
+import unittest
+
+from rhdash.bars import BarStore
+from rhdash.bars import to_seconds
+from tests.synthetic import synthetic_historicals
+
+
+class TestBarStore(unittest.TestCase):
+    """BarStore.sync"""
+    def setUp(self):
+        self.store = BarStore(":memory:", fresh_for={"day": 60})
+        self.year = synthetic_historicals("year")
+        self.now = to_seconds(self.year[-1]["begins_at"]) + 3600
+        self.spans = []
+
+    def fetch(self, bars):
+        def fetch(span):
+            self.spans.append(span)
+            return bars
+
+        return fetch
+
+    def test_incremental_sync(self):
+        """Only the missing bars are requested after the first sync"""
+        first = self.store.sync("SYN", "day", "year", self.fetch(self.year),
+                                now=self.now)
+        self.assertEqual(len(first), len(self.year))
+
+        self.store.sync("SYN", "day", "year", self.fetch(None),
+                        now=self.now + 30)
+        self.assertEqual(self.spans, ["year"])
+
+        revised = dict(self.year[-1], close_price="1.5")
+        newer = dict(revised, begins_at="2020-06-08T00:00:00Z")
+        bars = self.store.sync("SYN", "day", "year",
+                               self.fetch([revised, newer]),
+                               now=self.now + 3 * 24 * 3600)
+        self.assertEqual(self.spans, ["year", "week"])
+        self.assertEqual(bars[-1]["begins_at"], "2020-06-08T00:00:00Z")
+        self.assertEqual(bars[-2]["close_price"], 1.5)
+
+    def test_failed_fetch_serves_stored(self):
+        """Upstream failures fall back to the stored bars"""
+        self.assertIsNone(
+            self.store.sync("SYN", "day", "year", self.fetch(None)))
+        self.store.sync("SYN", "day", "year", self.fetch(self.year),
+                        now=self.now)
+        bars = self.store.sync("SYN", "day", "year", self.fetch([None]),
+                               now=self.now + 24 * 3600)
+        self.assertEqual(len(bars), len(self.year))
+
+        def fail(span):
+            raise TypeError("unexpected keyword argument 'interval'")
+
+        bars = self.store.sync("SYN", "day", "year", fail,
+                               now=self.now + 2 * 24 * 3600)
+        self.assertEqual(len(bars), len(self.year))
+
+    def test_short_reach(self):
+        """Bars stored for a day are fetched in full for a week"""
+        day = synthetic_historicals("day")
+        now = to_seconds(day[-1]["begins_at"]) + 60
+        self.store.merge("SYN", "5minute", day, synced_at=now, reach="day")
+        self.assertEqual(self.store.fetch_span("SYN", "5minute", "day", now),
+                         None)
+        self.assertEqual(
+            self.store.fetch_span("SYN", "5minute", "week", now), "week")
+
+        self.store.sync("SYN", "5minute", "week", self.fetch(day), now=now)
+        self.store.merge("SYN", "5minute", day, reach="day")
+        self.assertEqual(self.store.reach("SYN", "5minute"), "week")
+
+
+if __name__ == "__main__":
+    unittest.main()
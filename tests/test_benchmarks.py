@@ -0,0 +1,144 @@
+"""Micro-benchmarks for the data and figure hot paths.
+
+Best-of-N timings are written to RHDASH_BENCH_RESULTS as JSON. When a
+baseline file exists, any benchmark slower than THRESHOLD times its baseline
+fails. Set RHDASH_BENCH_SAVE_BASELINE=1 to record the current run as the
+baseline.
+"""
+import json
+import os
+import time
+import unittest
+from os.path import dirname
+from os.path import join
+
+import pandas as pd
+
+from rhdash.alg import ema_series
+from rhdash.panels import day_figure
+from rhdash.panels import week_figure
+from rhdash.panels import year_figure
+from rhdash.parse import parse_historicals
+from rhdash.screener import screen
+from tests.synthetic import synthetic_historicals
+
+BENCH_DIR = join(dirname(dirname(__file__)), ".benchmarks")
+RESULTS = os.environ.get("RHDASH_BENCH_RESULTS",
+                         join(BENCH_DIR, "latest.json"))
+BASELINE = os.environ.get("RHDASH_BENCH_BASELINE",
+                          join(BENCH_DIR, "baseline.json"))
+THRESHOLD = float(os.environ.get("RHDASH_BENCH_THRESHOLD", "1.5"))
+# Timings this close to the baseline never count as regressions
+SLACK = 0.001
+REPEAT = int(os.environ.get("RHDASH_BENCH_REPEAT", "5"))
+
+SPANS = ["day", "week", "year", "5year"]
+TIMEZONES = {"day": "US/Eastern", "week": "US/Eastern"}
+EMA_DAYS = [10, 20, 50, 100, 200]
+
+
+def load_baseline():
+    if os.path.isfile(BASELINE):
+        with open(BASELINE, "r") as baseline:
+            return json.load(baseline)
+    return {}
+
+
+def best_of(func, setup=None, repeat=REPEAT):
+    """Fastest of repeat runs of func(setup()), not counting setup."""
+    best = None
+    for _ in range(repeat):
+        args = (setup(), ) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Hot path timings"""
+    results = {}
+    baseline = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.baseline = load_baseline()
+        cls.payloads = {span: synthetic_historicals(span) for span in SPANS}
+        cls.frames = {
+            span: parse_historicals(cls.payloads[span], TIMEZONES.get(span))
+            for span in SPANS
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        os.makedirs(dirname(RESULTS), exist_ok=True)
+        with open(RESULTS, "w") as results:
+            json.dump(cls.results, results, indent=2, sort_keys=True)
+        if os.environ.get("RHDASH_BENCH_SAVE_BASELINE"):
+            os.makedirs(dirname(BASELINE), exist_ok=True)
+            with open(BASELINE, "w") as baseline:
+                json.dump(cls.results, baseline, indent=2, sort_keys=True)
+
+    def bench(self, name, func, setup=None):
+        elapsed = best_of(func, setup)
+        self.results[name] = elapsed
+        if name in self.baseline:
+            limit = self.baseline[name] * THRESHOLD + SLACK
+            self.assertLessEqual(
+                elapsed, limit,
+                f"{name} regressed: {elapsed:.6f}s vs "
+                f"baseline {self.baseline[name]:.6f}s")
+
+    def test_dataframe_construction(self):
+        """DataFrame from the raw list of dicts"""
+        for span in SPANS:
+            payload = self.payloads[span]
+            self.bench(f"dataframe.{span}", lambda: pd.DataFrame(payload))
+
+    def test_timestamp_parsing(self):
+        """begins_at parsing and timezone conversion"""
+        for span in SPANS:
+            begins_at = pd.DataFrame(self.payloads[span])["begins_at"]
+            tz = TIMEZONES.get(span, "US/Eastern")
+            self.bench(f"timestamps.{span}",
+                       lambda: pd.to_datetime(begins_at).dt.tz_convert(tz))
+
+    def test_parse_historicals(self):
+        """Full parse of a payload into a typed frame"""
+        for span in SPANS:
+            payload = self.payloads[span]
+            tz = TIMEZONES.get(span)
+            self.bench(f"frame.{span}",
+                       lambda: parse_historicals(payload, tz, span))
+
+    def test_ema(self):
+        """All configured EMAs over daily and weekly closes"""
+        for span in ["year", "5year"]:
+            close = self.frames[span]["close_price"].to_numpy()
+            self.bench(f"ema.{span}", lambda: ema_series(EMA_DAYS, close))
+
+    def test_screener(self):
+        """EMAs and percent distances for a 500 symbol watchlist"""
+        close = self.frames["year"]["close_price"].to_numpy()
+        closes = {
+            f"S{i:03}": close[i % 50:] * (1 + i / 1000)
+            for i in range(500)
+        }
+        self.bench("screener.500", lambda: screen(closes, EMA_DAYS))
+
+    def test_figure_assembly(self):
+        """Complete panel figures with EMAs on, then serialized"""
+        frames = dict(self.frames, symbol="SYN", name="Synthetic", version=1)
+        builders = {
+            "day": lambda: day_figure(frames),
+            "week": lambda: week_figure(frames),
+            "year": lambda: year_figure(frames, True, EMA_DAYS)
+        }
+        for span, build in builders.items():
+            self.bench(f"figure.{span}", build)
+            self.bench(f"figure_json.{span}", lambda: build().to_json())
+
+
+if __name__ == "__main__":
+    unittest.main()
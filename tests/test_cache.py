@@ -0,0 +1,69 @@
+"""Tests for rhdash.cache"""
+import tempfile
+import time
+import unittest
+from os.path import join
+
+from rhdash.cache import MISSING
+from rhdash.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """TTLCache"""
+    def test_lru_eviction(self):
+        """Least recently used entry goes first"""
+        cache = TTLCache(size=2, ttls={"name": 60})
+        cache.put(("name", "A"), "a")
+        cache.put(("name", "B"), "b")
+        self.assertEqual(cache.get(("name", "A")), "a")
+        cache.put(("name", "C"), "c")
+        self.assertIs(cache.get(("name", "B")), MISSING)
+        self.assertEqual(cache.get(("name", "A")), "a")
+        self.assertEqual(cache.get(("name", "C")), "c")
+
+    def test_expiry_per_endpoint(self):
+        """Each endpoint keeps entries for its own window"""
+        cache = TTLCache(ttls={"day": 0.01, "name": 60})
+        cache.put(("day", "A"), [1])
+        cache.put(("name", "A"), "a")
+        time.sleep(0.02)
+        self.assertIs(cache.get(("day", "A")), MISSING)
+        self.assertEqual(cache.get(("name", "A")), "a")
+        self.assertEqual(cache.stale(("day", "A")), [1])
+
+    def test_counters(self):
+        """Hits and misses are counted"""
+        cache = TTLCache()
+        cache.get(("year", "A"))
+        cache.put(("year", "A"), [1])
+        cache.get(("year", "A"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class TestSharedCache(unittest.TestCase):
+    """TTLCache backed by a SharedCache"""
+    def test_reuse_across_caches(self):
+        """Entries put by one cache are served to another, until expiry"""
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"shared": {"enabled": True, "path": join(tmp, "c")}}
+            first = TTLCache(ttls={"year": 60, "day": 0.05})
+            second = TTLCache(ttls={"year": 60, "day": 0.05})
+            first.configure(config)
+            second.configure(config)
+
+            first.put(("year", "A"), [{"close_price": "1.0"}])
+            first.put(("day", "A"), [1])
+            self.assertEqual(second.get(("year", "A")),
+                             [{"close_price": "1.0"}])
+            self.assertEqual(second.stats()["hits"], 1)
+            time.sleep(0.06)
+            self.assertIs(second.get(("day", "A")), MISSING)
+
+            first.invalidate(("year", "A"))
+            second.clear()
+            self.assertIs(second.get(("year", "A")), MISSING)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for rhdash.instruments"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from rhdash.instruments import InstrumentIndex
+
+
+def instrument(url):
+    symbol = url.rstrip("/").rsplit("/", 1)[-1].upper()
+    return {
+        "symbol": symbol,
+        "simple_name": f"{symbol} Inc",
+        "tradeable": True
+    }
+
+
+class TestInstrumentIndex(unittest.TestCase):
+    """InstrumentIndex"""
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    @mock.patch("rhdash.instruments.get_instrument_by_url",
+                side_effect=instrument)
+    def test_resolves_each_url_once(self, fetch):
+        """Known URLs are served locally, even after a restart"""
+        urls = [f"https://api/instruments/{s}/" for s in ("aapl", "msft")]
+        index = InstrumentIndex(self.path)
+        self.assertEqual(sorted(index.resolve(urls).values()),
+                         ["AAPL", "MSFT"])
+        self.assertEqual(fetch.call_count, 2)
+
+        reopened = InstrumentIndex(self.path)
+        more = urls + ["https://api/instruments/tsla/"]
+        self.assertEqual(len(reopened.resolve(more)), 3)
+        self.assertEqual(fetch.call_count, 3)
+        self.assertEqual(reopened.name_for(urls[0]), "AAPL Inc")
+
+    def test_full_index(self):
+        """Once synced, completion and lookups need nothing upstream"""
+        index = InstrumentIndex(self.path)
+        other = InstrumentIndex(self.path)
+        self.assertFalse(other.is_full())
+
+        index.sync([
+            dict(instrument(f"https://api/instruments/{s}/"),
+                 url=f"https://api/instruments/{s}/")
+            for s in ("aa", "aapl", "a", "msft", "aal")
+        ] + [{
+            "url": "https://api/instruments/old-aa/",
+            "symbol": "AA",
+            "simple_name": "Old Aa",
+            "tradeable": False
+        }])
+        self.assertTrue(other.is_full())
+        self.assertTrue(other.knows("AAPL"))
+        self.assertFalse(other.knows("AAPLX"))
+        self.assertEqual(other.name_of("AA"), "AA Inc")
+        self.assertEqual([c[0] for c in other.complete("aa")],
+                         ["AA", "AAL", "AAPL"])
+        self.assertEqual(other.complete("msft inc"),
+                         [("MSFT", "MSFT Inc", 1)])
+        self.assertEqual(other.complete("a", limit=2), [("A", "A Inc", 1),
+                                                         ("AA", "AA Inc", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
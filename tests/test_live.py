@@ -0,0 +1,85 @@
+"""Tests for rhdash.live"""
+import unittest
+from unittest import mock
+
+from rhdash import live
+from rhdash.data import parse_symbol
+from rhdash import panels
+from rhdash.panels import day_figure
+from tests.synthetic import synthetic_historicals
+
+
+class TestLiveUpdate(unittest.TestCase):
+    """live_base and live_update"""
+    def setUp(self):
+        self.day = synthetic_historicals("day")
+        self.show(self.day[:100])
+        patcher = mock.patch.object(live, "get_day_data",
+                                    lambda symbol: self.upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def show(self, shown):
+        frames = parse_symbol("SYN", {
+            "name": "Syn",
+            "fundamentals": None,
+            "day": shown,
+            "week": None,
+            "year": None
+        })
+        self.built = day_figure(frames).to_plotly_json()
+        self.figure = live.extendable(self.built)
+        self.base = live.live_base(frames, self.built)
+        self.upstream = shown
+
+    def test_extendable(self):
+        """The forming bar has its own traces, each with every key"""
+        self.assertEqual(len(self.figure["data"]), 4)
+        self.assertEqual(len(self.figure["data"][1]["x"]), 99)
+        for trace in self.figure["data"]:
+            self.assertTrue(set(live.TRACE_KEYS) <= set(trace))
+        # The built figure may be cached and shared, so it is left alone
+        self.assertNotIn("open", self.built["data"][0])
+
+    def test_unchanged(self):
+        extend, state = live.live_update(self.base, None)
+        self.assertIsNone(extend)
+        self.assertEqual(state["last"], self.day[99]["begins_at"])
+
+    def test_new_bars(self):
+        """New bars are appended and only the forming bar is replaced"""
+        self.upstream = self.day[:103]
+        extend, state = live.live_update(self.base, None)
+        update, traces, limits = extend
+        self.assertEqual(traces, [0, 1, 2, 3])
+        self.assertEqual([len(x) for x in update["x"]], [3, 3, 2, 1])
+        self.assertEqual(update["close"][1][0],
+                         float(self.day[99]["close_price"]))
+        self.assertEqual(update["close"][3],
+                         [float(self.day[102]["close_price"])])
+        self.assertEqual(limits["x"][2:], [2, 1])
+        self.assertEqual(state["last"], self.day[102]["begins_at"])
+
+        self.upstream = self.day[:102] + [
+            dict(self.day[102], close_price="1.5")
+        ]
+        update, _, _ = live.live_update(self.base, state)[0]
+        self.assertEqual([len(x) for x in update["x"]], [0, 0, 2, 1])
+        self.assertEqual(update["close"][3], [1.5])
+
+    def test_indicators(self):
+        """Indicator traces are extended by the bars completed since"""
+        day = {"day": [{"name": "sma", "period": 5}]}
+        with mock.patch.dict(panels.INDICATOR_SPECS, day):
+            self.show(self.day[:80])
+            self.assertEqual(len(self.figure["data"][4]["x"]), 79)
+            self.upstream = self.day[:84]
+            update, traces, _ = live.live_update(self.base, None)[0]
+        self.assertEqual(traces, [0, 1, 2, 3, 4])
+        self.assertEqual(update["x"][4], update["x"][1])
+        closes = [float(bar["close_price"]) for bar in self.day[78:83]]
+        self.assertAlmostEqual(update["y"][4][-1], sum(closes) / 5, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
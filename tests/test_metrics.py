@@ -0,0 +1,74 @@
+"""Tests for rhdash.metrics"""
+import unittest
+from base64 import b64encode
+
+from rhdash import app
+from rhdash import metrics
+from rhdash.metrics import Histogram
+from rhdash.metrics import InstrumentedProvider
+from rhdash.metrics import UPSTREAM_ERRORS
+from rhdash.metrics import UPSTREAM_SECONDS
+from rhdash.metrics import render
+from rhdash.startup import Startup
+
+
+class StubProvider:
+    def historicals(self, symbol, span, bounds="regular", interval=None):
+        return [{"symbol": symbol}] if symbol != "GONE" else None
+
+    def name(self, symbol):
+        raise ConnectionError("upstream down")
+
+
+class TestMetrics(unittest.TestCase):
+    """Metrics"""
+    def test_histogram_exposition(self):
+        """Buckets are cumulative and end with +Inf, sum and count"""
+        histogram = Histogram("test_seconds", "Test.", ["stage"], [.1, 1])
+        # Left registered, it would show up in every later scrape
+        self.addCleanup(metrics._collectors.remove, histogram.lines)
+        for value in [.05, .5, 5]:
+            histogram.observe(value, "parse")
+        text = render()
+        self.assertIn('test_seconds_bucket{stage="parse",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{stage="parse",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{stage="parse",le="+Inf"} 3',
+                      text)
+        self.assertIn('test_seconds_count{stage="parse"} 3', text)
+        self.assertIn("# TYPE test_seconds histogram", text)
+
+    def test_upstream_calls(self):
+        """Calls are timed per endpoint and failures counted"""
+        provider = InstrumentedProvider(StubProvider())
+        errors = UPSTREAM_ERRORS.value("year")
+        calls = UPSTREAM_SECONDS.count("year")
+
+        provider.historicals("SYN", "year")
+        provider.historicals("GONE", "year")
+        with self.assertRaises(ConnectionError):
+            provider.name("SYN")
+
+        self.assertEqual(UPSTREAM_SECONDS.count("year"), calls + 2)
+        self.assertEqual(UPSTREAM_ERRORS.value("year"), errors + 1)
+        self.assertGreaterEqual(UPSTREAM_ERRORS.value("name"), 1)
+
+
+class TestMetricsAuth(unittest.TestCase):
+    """/metrics behind the dashboard's credentials"""
+    def test_needs_credentials(self):
+        """Scrapes need credentials with or without fast start"""
+        config = {"dash": {"creds": {"user": "user", "password": "secret"}}}
+        startup = Startup(config, []).run()
+        token = b64encode(b"user:secret").decode()
+        for fast_start in [False, True]:
+            client = app.setup_dash(config, startup,
+                                    fast_start).server.test_client()
+            self.assertEqual(client.get(metrics.METRICS_PATH).status_code,
+                             401)
+            response = client.get(metrics.METRICS_PATH,
+                                  headers={"Authorization": "Basic " + token})
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Tests for rhdash.panels"""
+import unittest
+
+from rhdash.panels import FIGURES
+from rhdash.panels import FIGURE_BYTES
+from rhdash.panels import empty_figure
+from rhdash.panels import memoized_figure
+
+
+class TestMemoizedFigure(unittest.TestCase):
+    """memoized_figure"""
+    def setUp(self):
+        FIGURES.clear()
+        self.addCleanup(FIGURES.clear)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return empty_figure()
+
+    def frames(self, version):
+        return {"symbol": "SYN", "name": "Syn", "versions": {"day": version}}
+
+    def test_built_once_per_version(self):
+        """Repeat views are lookups; new bars replace the old entry"""
+        options = (True, "Up", "2", "1")
+        first = memoized_figure(self.frames("a"), "day", options, self.build)
+        again = memoized_figure(self.frames("a"), "day", options, self.build)
+        self.assertIs(first, again)
+        self.assertEqual(self.builds, 1)
+
+        FIGURE_BYTES.clear()
+        memoized_figure(self.frames("a"), "day", options, self.build)
+        self.assertEqual(FIGURE_BYTES["day"], len(empty_figure().to_json()))
+
+        memoized_figure(self.frames("b"), "day", options, self.build)
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(FIGURES.stats()["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Tests for rhdash.parse"""
+import unittest
+
+import pandas as pd
+
+from rhdash.parse import PRICE_COLS
+from rhdash.parse import parse_historicals
+from tests.synthetic import synthetic_historicals
+
+
+class TestParseHistoricals(unittest.TestCase):
+    """parse_historicals"""
+    def test_matches_pandas(self):
+        """Same values as the DataFrame/to_datetime/astype path"""
+        for span, tz in [("day", "US/Eastern"), ("year", None)]:
+            data = synthetic_historicals(span)
+            expected = pd.DataFrame(data)
+            expected["begins_at"] = pd.to_datetime(expected["begins_at"])
+            if tz:
+                expected["begins_at"] = expected["begins_at"].dt.tz_convert(
+                    tz)
+
+            df = parse_historicals(data, tz, span)
+            pd.testing.assert_series_equal(df["begins_at"],
+                                           expected["begins_at"],
+                                           check_dtype=False)
+            for col in PRICE_COLS:
+                pd.testing.assert_series_equal(df[col],
+                                               expected[col].astype(float))
+            self.assertEqual(df["volume"].dtype, "int64")
+
+    def test_empty(self):
+        """No bars gives an empty frame with the usual columns"""
+        df = parse_historicals([], "US/Eastern")
+        self.assertEqual(len(df), 0)
+        self.assertIn("close_price", df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Tests for rhdash.prefetch"""
+import time
+import unittest
+
+from rhdash.prefetch import Prefetcher
+
+
+class TestPrefetcher(unittest.TestCase):
+    """Prefetcher"""
+    def setUp(self):
+        self.fetched = []
+        self.config = {
+            "watchlist": ["AAPL", "MSFT", "TSLA"],
+            "robinhood": {
+                "prefetch": {
+                    "rate": 20,
+                    "concurrency": 2
+                }
+            }
+        }
+        self.prefetcher = Prefetcher(self.config,
+                                     fetches=[self.fetched.append])
+
+    def test_recent_first(self):
+        """Recently viewed symbols are warmed before the rest"""
+        self.prefetcher.touch("TSLA")
+        self.prefetcher.touch("NFLX")
+        self.assertEqual(self.prefetcher.symbols(),
+                         ["NFLX", "TSLA", "AAPL", "MSFT"])
+
+    def test_rate_ceiling(self):
+        """A pass never goes faster than the configured rate"""
+        start = time.monotonic()
+        self.prefetcher.run_once()
+        self.assertEqual(sorted(self.fetched), ["AAPL", "MSFT", "TSLA"])
+        self.assertGreaterEqual(time.monotonic() - start, 2 / 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for rhdash.providers"""
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from rhdash.providers import RecordingProvider
+from rhdash.providers import ReplayProvider
+from rhdash.providers import RobinhoodProvider
+
+
+class TestRecordReplay(unittest.TestCase):
+    """RecordingProvider and ReplayProvider"""
+    def setUp(self):
+        self.fixtures = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.fixtures)
+
+    def test_round_trip(self):
+        """Recorded responses replay offline with the configured latency"""
+        live = mock.Mock()
+        live.historicals.return_value = [{"close_price": "1.0"}]
+        live.name.return_value = "Stub Inc"
+
+        recorder = RecordingProvider(live, self.fixtures)
+        recorder.historicals("STUB", "day", "extended")
+        recorder.name("STUB")
+
+        replay = ReplayProvider(self.fixtures, latency=0.05)
+        start = time.monotonic()
+        self.assertEqual(replay.historicals("STUB", "day", "extended"),
+                         [{"close_price": "1.0"}])
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(replay.name("STUB"), "Stub Inc")
+        self.assertIsNone(replay.historicals("STUB", "year", "regular"))
+
+
+class TestHistoricals(unittest.TestCase):
+    """RobinhoodProvider.historicals across robin_stocks releases"""
+    def historicals(self, stocks, *args):
+        with mock.patch("rhdash.providers.robin_stocks",
+                        SimpleNamespace(stocks=stocks)):
+            RobinhoodProvider().historicals("STUB", *args)
+
+    def test_interval(self):
+        """The interval is passed when robin_stocks takes one"""
+        stocks = mock.Mock(spec=["get_stock_historicals"])
+        self.historicals(stocks, "day", "extended")
+        stocks.get_stock_historicals.assert_called_with("STUB",
+                                                        interval="5minute",
+                                                        span="day",
+                                                        bounds="extended")
+
+    def test_implied_interval(self):
+        """Otherwise the span is widened to one with that interval"""
+        stocks = mock.Mock(spec=["get_historicals"])
+        self.historicals(stocks, "week", "regular", "day")
+        stocks.get_historicals.assert_called_with("STUB",
+                                                  span="year",
+                                                  bounds="regular")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Tests for rhdash.resample"""
+import unittest
+from datetime import datetime
+
+from rhdash.resample import divides
+from rhdash.resample import resample
+from tests.synthetic import synthetic_historicals
+
+
+class TestResample(unittest.TestCase):
+    """resample"""
+    def setUp(self):
+        self.day = synthetic_historicals("day")
+        self.regular = [bar for bar in self.day if bar["session"] == "reg"]
+
+    def test_aggregates(self):
+        """Open, high, low, close and volume of the bars covered"""
+        bars = resample(self.day, "5minute", "10minute")
+        self.assertEqual(len(bars), len(self.regular) // 2)
+        self.assertEqual(bars[0]["begins_at"], "2020-06-05T13:30:00Z")
+        first, second = self.regular[:2]
+        self.assertEqual(bars[0]["open_price"], float(first["open_price"]))
+        self.assertEqual(bars[0]["close_price"],
+                         float(second["close_price"]))
+        self.assertEqual(
+            bars[0]["high_price"],
+            max(float(first["high_price"]), float(second["high_price"])))
+        self.assertEqual(
+            bars[0]["low_price"],
+            min(float(first["low_price"]), float(second["low_price"])))
+        self.assertEqual(bars[0]["volume"],
+                         first["volume"] + second["volume"])
+
+    def test_sessions_kept_apart(self):
+        """Bars start at their session's open and never span two sessions"""
+        bars = resample(self.day, "5minute", "hour", None)
+        stamps = [bar["begins_at"] for bar in bars]
+        self.assertEqual(stamps, sorted(set(stamps)))
+        regular = [bar for bar in bars if bar["session"] == "reg"]
+        self.assertEqual(regular[0]["begins_at"], "2020-06-05T13:30:00Z")
+        self.assertEqual(regular[-1]["begins_at"], "2020-06-05T19:30:00Z")
+        self.assertEqual(sum(bar["volume"] for bar in bars),
+                         sum(bar["volume"] for bar in self.day))
+
+    def test_market_time(self):
+        """Buckets follow the market's clock through daylight saving"""
+        winter = [
+            dict(bar, begins_at=stamp) for bar, stamp in zip(
+                self.regular,
+                ["2020-01-06T14:30:00Z", "2020-01-06T15:35:00Z"])
+        ]
+        bars = resample(winter, "5minute", "hour")
+        self.assertEqual([bar["begins_at"] for bar in bars],
+                         ["2020-01-06T14:30:00Z", "2020-01-06T15:30:00Z"])
+
+    def test_weeks_from_days(self):
+        year = synthetic_historicals("year")
+        bars = resample(year, "day", "week")
+        for bar in bars:
+            begins_at = datetime.strptime(bar["begins_at"],
+                                          "%Y-%m-%dT%H:%M:%SZ")
+            self.assertEqual(begins_at.weekday(), 0)
+        self.assertEqual(sum(bar["volume"] for bar in bars),
+                         sum(bar["volume"] for bar in year))
+
+    def test_divides(self):
+        self.assertTrue(divides("5minute", "15minute"))
+        self.assertTrue(divides("hour", "4hour"))
+        self.assertTrue(divides("day", "week"))
+        self.assertFalse(divides("10minute", "15minute"))
+        self.assertFalse(divides("day", "hour"))
+        with self.assertRaises(ValueError):
+            resample(self.day, "week", "day")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+"""Tests for rhdash.rh against a stubbed robin_stocks"""
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from rhdash import rh
+from rhdash.bars import BarStore
+from tests.synthetic import synthetic_historicals
+
+LATENCY = 0.2
+
+
+def slow(value):
+    """Stub upstream call that answers after LATENCY seconds."""
+    def call(*args, **kwargs):
+        time.sleep(LATENCY)
+        return value
+
+    return call
+
+
+def stub_robin_stocks():
+    bar = {
+        "begins_at": "2020-06-01T13:30:00Z",
+        "open_price": "1.0",
+        "close_price": "2.0",
+        "high_price": "3.0",
+        "low_price": "0.5",
+        "volume": 10
+    }
+    stocks = SimpleNamespace(get_name_by_symbol=slow("Stub Inc"),
+                             get_fundamentals=slow([{
+                                 "open": "1.0"
+                             }]),
+                             get_historicals=slow([bar]))
+    return SimpleNamespace(stocks=stocks)
+
+
+class TestFetchSymbolData(unittest.TestCase):
+    """fetch_symbol_data"""
+    def setUp(self):
+        rh.CACHE.clear()
+        patcher = mock.patch("rhdash.providers.robin_stocks",
+                             stub_robin_stocks())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rh.CACHE.clear)
+
+    def test_fetches_concurrently(self):
+        """Latency is close to one upstream call, not the sum of five"""
+        start = time.monotonic()
+        data = rh.fetch_symbol_data("STUB")
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(data["name"], "Stub Inc")
+        self.assertEqual(len(data["year"]), 1)
+        self.assertLess(elapsed, 2.5 * LATENCY)
+
+    def test_repeat_is_cached(self):
+        """A second fetch of the same symbol is served from the cache"""
+        rh.fetch_symbol_data("STUB")
+        start = time.monotonic()
+        rh.fetch_symbol_data("STUB")
+        self.assertLess(time.monotonic() - start, LATENCY)
+        self.assertEqual(rh.cache_stats()["hits"], 5)
+
+    def test_late_fetch(self):
+        """A hung endpoint is left out, then filled in once it answers"""
+        release = threading.Event()
+
+        def hung(*args, **kwargs):
+            release.wait(5)
+            return [{"open": "2.0"}]
+
+        with mock.patch.object(rh.PROVIDER.inner, "fundamentals", hung):
+            start = time.monotonic()
+            data = rh.fetch_symbol_data("STUB", budget=2 * LATENCY)
+            self.assertLess(time.monotonic() - start, 3 * LATENCY)
+            self.assertEqual(data["name"], "Stub Inc")
+            self.assertIsNone(data["fundamentals"])
+            self.assertEqual(data["pending"], ["fundamentals"])
+            self.assertEqual(data["late"], ["fundamentals"])
+
+            release.set()
+            data = rh.fetch_symbol_data("STUB", budget=2 * LATENCY)
+        self.assertEqual(data["fundamentals"], [{"open": "2.0"}])
+        self.assertEqual(data["pending"], [])
+
+    def test_polling_hung_endpoint(self):
+        """Asking again for a hung endpoint leaves workers for the rest"""
+        release = threading.Event()
+        fundamentals = rh.PROVIDER.inner.fundamentals
+
+        def hung(symbol):
+            if symbol == "HUNG":
+                release.wait(5)
+            return fundamentals(symbol)
+
+        with mock.patch.object(rh.PROVIDER.inner, "fundamentals", hung):
+            for _ in range(3 * rh.POOL["workers"]):
+                rh.fetch_symbol_data("HUNG", budget=0.01)
+            data = rh.fetch_symbol_data("STUB", budget=4 * LATENCY)
+            flight = rh.FLIGHTS.pending(("fundamentals", "HUNG"))
+            release.set()
+            flight.result()
+        self.assertEqual(data["late"], [])
+        self.assertEqual(data["fundamentals"], [{"open": "1.0"}])
+
+    def test_stale_fallback(self):
+        """A failed fetch falls back to its expired value"""
+        patcher = mock.patch.dict(rh.CACHE.ttls, {"name": 0.01})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertEqual(rh.get_name("STUB"), "Stub Inc")
+        time.sleep(0.02)
+        with mock.patch.object(rh.PROVIDER.inner, "name", None):
+            data = rh.fetch_symbol_data("STUB")
+        self.assertEqual(data["name"], "Stub Inc")
+        self.assertEqual(data["stale"], ["name"])
+        self.assertEqual(data["late"], [])
+
+    def test_concurrent_calls_coalesce(self):
+        """Sessions asking at once share a single upstream call"""
+        calls = []
+        name = slow("Stub Inc")
+        coalesced = rh.cache_stats()["coalesced"]
+        with mock.patch.object(rh.PROVIDER.inner, "name",
+                               lambda symbol: calls.append(symbol) or name()):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                names = list(pool.map(rh.get_name, ["STUB"] * 4))
+        self.assertEqual(names, ["Stub Inc"] * 4)
+        self.assertEqual(calls, ["STUB"])
+        self.assertEqual(rh.cache_stats()["coalesced"] - coalesced, 3)
+
+
+class TestBatchFetches(unittest.TestCase):
+    """get_historicals_batch and get_fundamentals_batch"""
+    def setUp(self):
+        rh.CACHE.clear()
+        self.requests = []
+        stocks = SimpleNamespace(get_historicals=self.historicals,
+                                 get_fundamentals=self.fundamentals)
+        patchers = [
+            mock.patch("rhdash.providers.robin_stocks",
+                       SimpleNamespace(stocks=stocks)),
+            mock.patch.dict(rh.BATCH, {
+                "historicals": 2,
+                "fundamentals": 2
+            }),
+            mock.patch.object(rh, "BARS", None)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(rh.CACHE.clear)
+
+    def historicals(self, symbols, **options):
+        self.requests.append(list(symbols))
+        return [{
+            "symbol": symbol,
+            "begins_at": "2020-06-01T00:00:00Z",
+            "close_price": "2.0"
+        } for symbol in symbols if symbol != "GONE"]
+
+    def fundamentals(self, symbols):
+        raise ConnectionError("upstream down")
+
+    def test_chunked_requests(self):
+        """One request per chunk, per-symbol results and errors"""
+        results, errors = rh.get_historicals_batch(
+            ["aapl", "MSFT", "GONE", "TSLA", "NFLX"], "year")
+        self.assertEqual(self.requests,
+                         [["AAPL", "MSFT"], ["GONE", "TSLA"], ["NFLX"]])
+        self.assertEqual(sorted(results), ["AAPL", "MSFT", "NFLX", "TSLA"])
+        self.assertEqual(results["TSLA"][0]["symbol"], "TSLA")
+        self.assertEqual(list(errors), ["GONE"])
+
+        self.assertEqual(rh.get_year_data("MSFT"), results["MSFT"])
+        self.assertEqual(len(self.requests), 3)
+
+    def test_failed_request(self):
+        """A failed request reports an error for each of its symbols"""
+        results, errors = rh.get_fundamentals_batch(["AAPL", "MSFT", "TSLA"])
+        self.assertEqual(results, {})
+        self.assertEqual(errors, dict.fromkeys(["AAPL", "MSFT", "TSLA"],
+                                               "upstream down"))
+
+
+def regular_bars(dates):
+    """Five-minute regular session bars on dates, as upstream sends them."""
+    day = [
+        bar for bar in synthetic_historicals("day")
+        if bar["session"] == "reg"
+    ]
+    return [
+        dict(bar, begins_at=date + bar["begins_at"][10:]) for date in dates
+        for bar in day
+    ]
+
+
+class TestDerivedBars(unittest.TestCase):
+    """Week bars built from the day graph's five-minute bars"""
+    def setUp(self):
+        rh.CACHE.clear()
+        self.requests = []
+        self.day = synthetic_historicals("day")
+        stocks = SimpleNamespace(get_stock_historicals=self.historicals)
+        patchers = [
+            mock.patch("rhdash.providers.robin_stocks",
+                       SimpleNamespace(stocks=stocks)),
+            mock.patch.object(rh, "BARS", BarStore(":memory:"))
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(rh.CACHE.clear)
+
+    def historicals(self, symbols, interval, span, bounds):
+        self.requests.append((interval, span, bounds))
+        if span == "week":
+            dates = ["2020-06-0" + str(day) for day in range(1, 6)]
+            return regular_bars(dates)
+        return self.day
+
+    def test_week_from_day(self):
+        """Upstream is asked for the week once, then only for the day"""
+        week = rh.get_week_data("SYN")
+        self.assertEqual(self.requests, [("5minute", "day", "extended"),
+                                         ("5minute", "week", "regular")])
+        self.assertEqual(len(week), 5 * 39)
+        self.assertEqual(week[0]["begins_at"], "2020-06-01T13:30:00Z")
+        self.assertEqual({bar["session"] for bar in week}, {"reg"})
+
+        rh.CACHE.clear()
+        self.assertEqual(rh.get_week_data("SYN"), week)
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.requests[-1], ("5minute", "day", "extended"))
+
+
+class TestYearCloses(unittest.TestCase):
+    """year_closes for the screener"""
+    def setUp(self):
+        rh.CACHE.clear()
+        self.requests = []
+        self.year = synthetic_historicals("year")
+        stocks = SimpleNamespace(get_stock_historicals=self.historicals)
+        patchers = [
+            mock.patch("rhdash.providers.robin_stocks",
+                       SimpleNamespace(stocks=stocks)),
+            mock.patch.object(rh, "BARS", BarStore(":memory:"))
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(rh.CACHE.clear)
+
+    def historicals(self, symbols, interval, span, bounds):
+        self.requests.append(list(symbols))
+        return [
+            dict(self.year[-1],
+                 symbol=symbol,
+                 begins_at="2020-06-08T00:00:00Z",
+                 close_price="99.0") for symbol in symbols
+        ]
+
+    def test_stale_symbol_synced(self):
+        """Stored bars that are out of date are brought up to date"""
+        now = time.time()
+        rh.BARS.merge("OLD", "day", self.year, synced_at=0, reach="year")
+        rh.BARS.merge("NEW", "day", self.year, synced_at=now, reach="year")
+        closes = rh.year_closes(["OLD", "NEW"])
+        self.assertEqual(self.requests, [["OLD"]])
+        self.assertEqual(closes["OLD"][-1], 99.0)
+        self.assertEqual(closes["NEW"][-1],
+                         float(self.year[-1]["close_price"]))
+
+    def test_window_per_symbol(self):
+        """Each symbol's year counts back from its own newest bar"""
+        now = time.time()
+        rh.BARS.merge("SYN", "day", self.year, synced_at=now, reach="year")
+        later = dict(self.year[-1], begins_at="2021-06-01T00:00:00Z")
+        rh.BARS.merge("LATER", "day", [later], synced_at=now, reach="year")
+        closes = rh.year_closes(["SYN", "LATER"])
+        self.assertEqual(self.requests, [])
+        self.assertEqual(len(closes["SYN"]), len(self.year))
+        self.assertEqual(len(closes["LATER"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Tests for rhdash.screener"""
+import unittest
+
+import numpy as np
+
+from rhdash.alg import ema_series
+from rhdash.alg import percent_diff
+from rhdash.bars import BarStore
+from rhdash.screener import screen
+from tests.synthetic import synthetic_historicals
+
+
+class TestScreen(unittest.TestCase):
+    """screen"""
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.closes = {
+            f"S{i:03}": 100 + np.cumsum(rng.normal(0, 1, 252 - i * 40))
+            for i in range(5)
+        }
+
+    def test_matches_single_symbol(self):
+        """Batched results equal each symbol computed on its own"""
+        table = screen(self.closes, [10, 50, 100]).set_index("symbol")
+        for symbol, close in self.closes.items():
+            emas = ema_series([10, 50, 100], close)
+            row = table.loc[symbol]
+            self.assertEqual(row["close"], close[-1])
+            for n_days in [10, 50, 100]:
+                np.testing.assert_allclose(row[f"ema_{n_days}"],
+                                           emas[n_days][-1])
+                np.testing.assert_allclose(
+                    row[f"diff_{n_days}"],
+                    percent_diff(close[-1], emas[n_days][-1]))
+        self.assertTrue(np.isnan(table.loc["S004", "ema_100"]))
+
+    def test_stored_closes(self):
+        """Closes come straight from the bar store"""
+        store = BarStore(":memory:")
+        year = synthetic_historicals("year")
+        store.merge("SYN", "day", year)
+        closes = store.closes(["SYN", "NONE"], "day", "year")
+        self.assertEqual(list(closes), ["SYN"])
+        self.assertEqual(closes["SYN"][-1], float(year[-1]["close_price"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Tests for rhdash.startup"""
+import subprocess
+import sys
+import unittest
+
+from flask import Flask
+
+from rhdash.startup import Startup
+from rhdash.startup import add_health_check
+from rhdash.startup import basic_auth_gate
+
+
+class TestStartup(unittest.TestCase):
+    """Fast start"""
+    def test_light_app_import(self):
+        """Importing the app leaves numpy, pandas, plotly and dash_auth"""
+        heavy = ["numpy", "pandas", "plotly.graph_objects", "dash_auth"]
+        loaded = subprocess.run([
+            sys.executable, "-c", "import sys, rhdash.app; "
+            f"print([m for m in {heavy!r} if m in sys.modules])"
+        ],
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.strip()
+        self.assertEqual(loaded, "[]")
+
+    def test_auth_gate(self):
+        """Everything but the health check needs credentials"""
+        def fail(config):
+            sys.exit(1)
+
+        server = Flask(__name__)
+        server.add_url_rule("/", "index", lambda: "index")
+        startup = Startup({}, [fail]).start()
+        basic_auth_gate(server, {"user": "secret"})
+        add_health_check(server, startup)
+        client = server.test_client()
+
+        self.assertFalse(startup.wait(5))
+        self.assertEqual(client.get("/healthz").json, {
+            "ready": True,
+            "error": "fail failed"
+        })
+        self.assertEqual(client.get("/").status_code, 401)
+        self.assertEqual(
+            client.get("/", headers={
+                "Authorization": "Basic dXNlcjpzZWNyZXQ="
+            }).data, b"index")
+
+
+if __name__ == "__main__":
+    unittest.main()